@@ -1,5 +1,6 @@
 import { NextResponse } from 'next/server';
 import { PrismaClient } from '@prisma/client';
+import { appendImportedFingerprints, readImportedFingerprints } from '@/lib/ocrResultsStore';
 
 const prisma = new PrismaClient();
 
@@ -12,6 +13,7 @@ type ImportItem = {
   price?: number;
   date?: string;
   description?: string;
+  fingerprint?: string;
 };
 
 export async function POST(request: Request) {
@@ -23,18 +25,37 @@ export async function POST(request: Request) {
       return NextResponse.json({ imported: 0, message: 'Keine Items ausgewählt.' }, { status: 400 });
     }
 
+    // Erst validieren, dann bereits importierte Fingerprints (und Duplikate innerhalb
+    // der Anfrage) überspringen – ein ungültiges Item blockiert kein gültiges Duplikat
+    const imported = await readImportedFingerprints();
+    let duplicates = 0;
+    let invalid = 0;
+    const fingerprints: string[] = [];
     const data = items
       .map((item) => {
         const name = (item.name ?? '').trim();
-        if (!name) return null;
-
         const type = item.type === 'income' ? 'income' : 'expense';
         const priceValue = Number(item.price);
-        if (!Number.isFinite(priceValue) || priceValue <= 0) return null;
-
         const dateValue = item.date ? new Date(item.date) : null;
-        if (!dateValue || Number.isNaN(dateValue.getTime())) return null;
+        const valid =
+          Boolean(name) &&
+          Number.isFinite(priceValue) &&
+          priceValue > 0 &&
+          dateValue !== null &&
+          !Number.isNaN(dateValue.getTime());
+        if (!valid) {
+          invalid += 1;
+          return null;
+        }
 
+        if (item.fingerprint) {
+          if (imported.has(item.fingerprint)) {
+            duplicates += 1;
+            return null;
+          }
+          imported.add(item.fingerprint);
+          fingerprints.push(item.fingerprint);
+        }
         return {
           date: dateValue,
           name,
@@ -48,15 +69,27 @@ export async function POST(request: Request) {
       })
       .filter((entry): entry is NonNullable<typeof entry> => Boolean(entry));
 
+    if (!data.length && duplicates && !invalid) {
+      return NextResponse.json({ imported: 0, duplicates, message: 'Alle Items wurden bereits importiert.' });
+    }
+
     if (!data.length) {
-      return NextResponse.json({ imported: 0, message: 'Keine validen Items gefunden.' }, { status: 400 });
+      return NextResponse.json(
+        { imported: 0, duplicates, invalid, message: 'Keine validen Items gefunden.' },
+        { status: 400 },
+      );
     }
 
     await prisma.transaction.createMany({
       data,
     });
 
-    return NextResponse.json({ imported: data.length });
+    // Importierte Fingerprints merken, damit ?pending=1 und spätere Importe sie überspringen
+    await appendImportedFingerprints(fingerprints).catch((error) =>
+      console.error('Failed to record imported fingerprints', error),
+    );
+
+    return NextResponse.json({ imported: data.length, duplicates, invalid });
   } catch (error) {
     console.error('Failed to import OCR items', error);
     return NextResponse.json({ imported: 0, error: 'Import fehlgeschlagen.' }, { status: 500 });
@@ -1,24 +1,40 @@
-import { NextResponse } from 'next/server';
-import path from 'path';
-import fs from 'fs';
+import { NextRequest, NextResponse } from 'next/server';
+import { readImportedFingerprints, readRunIndex, readRuns } from '@/lib/ocrResultsStore';
 
-export async function GET() {
+const noStore = { 'Cache-Control': 'no-store' };
+
+// GET /api/process/items
+//   ?run=<id>     bestimmter Run (Standard: letzter Run)
+//   ?since=<ISO>  alle Runs mit captured_at >= since
+//   ?pending=1    nur noch nicht importierte Items
+export async function GET(request: NextRequest) {
   try {
-    const filePath = path.join(process.cwd(), 'data', 'ocr-latest.json');
-    if (!fs.existsSync(filePath)) {
-      return NextResponse.json({ items: [] }, { headers: { 'Cache-Control': 'no-store' } });
+    const params = request.nextUrl.searchParams;
+    const runs = await readRunIndex();
+    if (!runs.length) {
+      return NextResponse.json({ items: [], runId: null }, { headers: noStore });
     }
 
-    const content = await fs.promises.readFile(filePath, 'utf-8');
-    const parsed = JSON.parse(content);
-    if (!Array.isArray(parsed)) {
-      return NextResponse.json({ items: [] }, { headers: { 'Cache-Control': 'no-store' } });
+    const since = params.get('since');
+    const runId = params.get('run');
+    const selected = since
+      ? runs.filter((run) => run.captured_at >= since)
+      : runId
+        ? runs.filter((run) => run.run_id === runId)
+        : runs.slice(-1);
+
+    let items = await readRuns(selected);
+    if (params.get('pending') === '1') {
+      const imported = await readImportedFingerprints();
+      items = items.filter((item) => !imported.has(item.fingerprint));
     }
 
-    return NextResponse.json({ items: parsed }, { headers: { 'Cache-Control': 'no-store' } });
+    return NextResponse.json(
+      { items, runId: selected[selected.length - 1]?.run_id ?? null },
+      { headers: noStore },
+    );
   } catch (error) {
-    console.error('Failed to read ocr-latest.json', error);
-    return NextResponse.json({ items: [] }, { headers: { 'Cache-Control': 'no-store' }, status: 500 });
+    console.error('Failed to read OCR results', error);
+    return NextResponse.json({ items: [] }, { headers: noStore, status: 500 });
   }
 }
-
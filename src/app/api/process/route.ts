@@ -1,122 +1,116 @@
 // src/app/api/process/route.ts
-import { NextRequest } from 'next/server';
-import { spawn } from 'child_process';
-import path from 'path';
-import fs from 'fs';
-import { promises as fsp } from 'fs';
+import { NextRequest, NextResponse } from 'next/server';
+import {
+  cancelJob,
+  findJob,
+  requestJob,
+  schedulerStatus,
+  subscribe,
+  summarizeJob,
+  type JobPolicy,
+  type PipelineJob,
+} from '@/lib/pipelineJobs';
 
+const POLICIES: JobPolicy[] = ['attach', 'queue', 'reject'];
+
+// Last-Event-ID hat die Form "<jobId>:<seq>" → Reconnect setzt nach seq fort
+function parseLastEventId(value: string | null): { job: PipelineJob; fromSeq: number } | null {
+  if (!value) return null;
+  const separator = value.lastIndexOf(':');
+  const job = findJob(value.slice(0, separator));
+  const seq = Number(value.slice(separator + 1));
+  if (!job || !Number.isInteger(seq)) return null;
+  return { job, fromSeq: seq + 1 };
+}
+
+// GET /api/process            an laufenden Job anhängen oder neuen starten (SSE)
+//   ?policy=queue|reject       neuen Lauf einreihen bzw. ablehnen, solange einer läuft
+//   ?job=<id>                  nur an einen bestimmten Job anhängen
+//   ?status=1                  Scheduler-Status als JSON statt Stream
 export async function GET(request: NextRequest) {
+  const params = request.nextUrl.searchParams;
+  if (params.get('status') === '1') {
+    return NextResponse.json(schedulerStatus(), { headers: { 'Cache-Control': 'no-store' } });
+  }
+
+  let job: PipelineJob;
+  let fromSeq = 0;
+  let deduped = true;
+
+  const lastEventId = request.headers.get('last-event-id');
+  const resumed = parseLastEventId(lastEventId);
+  const requestedId = params.get('job');
+  if (lastEventId && !resumed) {
+    // Reconnect auf einen unbekannten oder verdrängten Job: 204 beendet die EventSource,
+    // statt über requestJob versehentlich einen neuen Lauf zu starten
+    return new Response(null, { status: 204 });
+  }
+  if (resumed) {
+    // EventSource-Reconnect: niemals einen neuen Lauf starten
+    ({ job, fromSeq } = resumed);
+  } else if (requestedId) {
+    const found = findJob(requestedId);
+    if (!found) {
+      return NextResponse.json({ error: 'job_not_found' }, { status: 404 });
+    }
+    job = found;
+  } else {
+    const policyParam = params.get('policy') as JobPolicy | null;
+    const policy = policyParam && POLICIES.includes(policyParam) ? policyParam : 'attach';
+    const result = requestJob(policy);
+    if ('rejected' in result) {
+      return NextResponse.json(
+        { error: 'pipeline_busy', job: summarizeJob(result.rejected) },
+        { status: 409 },
+      );
+    }
+    ({ job, deduped } = result);
+  }
+
   const encoder = new TextEncoder();
+  let unsubscribe = () => {};
 
   const stream = new ReadableStream({
     start(controller) {
       let isClosed = false;
-      const logDir = path.join(process.cwd(), 'data');
-      const logFile = path.join(logDir, 'process-log.jsonl');
-
-      const safeAppend = async (line: string) => {
-        try {
-          if (!fs.existsSync(logDir)) {
-            await fsp.mkdir(logDir, { recursive: true });
-          }
-          await fsp.appendFile(logFile, line + '\n', 'utf-8');
-        } catch (_) {
-          // ignore file write errors to not break SSE
-        }
-      };
 
-      const sendEvent = (data: string) => {
+      const send = (chunk: string) => {
         if (isClosed) return;
-        
         try {
-          controller.enqueue(encoder.encode(data));
-        } catch (e) {
+          controller.enqueue(encoder.encode(chunk));
+        } catch {
           // Controller wurde bereits geschlossen (z.B. durch Browser disconnect)
           isClosed = true;
+          unsubscribe();
         }
       };
 
-      // Python-Pfade
-      const pythonScriptPath = path.join(process.cwd(), 'src', 'python', 'main.py');
-      const pythonDir = path.join(process.cwd(), 'src', 'python');
-      const pythonExecutable = path.join(process.cwd(), '.venv', 'bin', 'python');
-
-      // Python-Prozess starten mit unbuffered output (-u flag)
-      const pythonProcess = spawn(pythonExecutable, ['-u', pythonScriptPath], {
-        cwd: pythonDir,
-        stdio: ['pipe', 'pipe', 'pipe'],
-        env: { ...process.env, PYTHONUNBUFFERED: '1' }
-      });
-
-      // STDOUT verarbeiten (hier kommen die LOG: Messages)
-      pythonProcess.stdout.on('data', (data) => {
-        const output = data.toString();
-        const lines = output.split('\n');
+      // Eigenes Event-Format, damit onmessage nur Pipeline-Logs sieht
+      send(`event: job\ndata: ${JSON.stringify({ ...summarizeJob(job), deduped })}\n\n`);
 
-        lines.forEach((line: string) => {
-          if (line.trim().startsWith('LOG:')) {
-            const logJson = line.substring(4).trim();
-            // Forward via SSE
-            sendEvent(`data: ${logJson}\n\n`);
-            // Persist JSON line
-            safeAppend(logJson);
-          } else if (line.trim()) {
-            // Debug: Zeige auch andere Python-Ausgaben
-            const debugLog = {
-              level: 'debug',
-              message: 'Python Output',
-              data: { output: line }
-            };
-            const json = JSON.stringify(debugLog);
-            sendEvent(`data: ${json}\n\n`);
-            safeAppend(json);
-          }
-        });
-      });
-
-      // STDERR verarbeiten (für Python Errors)
-      pythonProcess.stderr.on('data', (data) => {
-        const errorLog = {
-          level: 'error',
-          message: 'Python Error',
-          data: { error: data.toString() }
-        };
-        const json = JSON.stringify(errorLog);
-        sendEvent(`data: ${json}\n\n`);
-        safeAppend(json);
-      });
-
-      // Prozess-Ende
-      pythonProcess.on('close', (code) => {
-        if (isClosed) return;
-        
-        const doneLog = {
-          level: code === 0 ? 'info' : 'error',
-          message: code === 0 ? '✅ Pipeline abgeschlossen' : '❌ Pipeline mit Fehler beendet',
-          data: { exitCode: code }
-        };
-        const json = JSON.stringify(doneLog);
-        sendEvent(`data: ${json}\n\n`);
-        safeAppend(json);
-        
-        // Kurz warten bevor wir schließen (damit letzte Events ankommen)
-        setTimeout(() => {
-          if (!isClosed) {
+      unsubscribe = subscribe(
+        job,
+        fromSeq,
+        ({ seq, json }) => send(`id: ${job.id}:${seq}\ndata: ${json}\n\n`),
+        () => {
+          // Kurz warten bevor wir schließen (damit letzte Events ankommen)
+          setTimeout(() => {
+            if (isClosed) return;
             isClosed = true;
             try {
               controller.close();
-            } catch (e) {
+            } catch {
               // Already closed
             }
-          }
-        }, 100);
-      });
+          }, 100);
+        },
+      );
     },
-    
+
     cancel() {
-      // Wird aufgerufen wenn Browser die Verbindung schließt
-      // Python-Prozess läuft aber weiter (das ist ok)
-    }
+      // Browser hat die Verbindung geschlossen – der Job läuft für andere Abonnenten weiter
+      unsubscribe();
+    },
   });
 
   return new Response(stream, {
@@ -127,3 +121,12 @@ export async function GET(request: NextRequest) {
     },
   });
 }
+
+// DELETE /api/process?job=<id>  Job abbrechen (Standard: laufender Job)
+export async function DELETE(request: NextRequest) {
+  const job = cancelJob(request.nextUrl.searchParams.get('job'));
+  if (!job) {
+    return NextResponse.json({ error: 'job_not_found' }, { status: 404 });
+  }
+  return NextResponse.json({ job: summarizeJob(job) });
+}
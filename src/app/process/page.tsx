@@ -71,16 +71,22 @@ type PipelineState = {
   hasErrors: boolean;
 };
 
+// Records aus /api/process/items: Rohtexte plus typisierte Felder aus normalize_items.py
 type RawOcrItem = {
+  fingerprint?: string;
   name?: string;
   category?: string;
   price?: string;
   tag?: string;
   date?: string;
+  type?: string;
+  amount?: number | null;
+  date_iso?: string | null;
 };
 
 type EditableOcrItem = {
   id: string;
+  fingerprint?: string;
   index: number;
   include: boolean;
   error?: string;
@@ -153,7 +159,11 @@ const STEP_INDEX_BY_ID: Record<StepId, number> = {
   ocr: 2,
 };
 
-const RUN_END_MESSAGES = new Set(['✅ Pipeline abgeschlossen', '❌ Pipeline mit Fehler beendet']);
+const RUN_END_MESSAGES = new Set([
+  '✅ Pipeline abgeschlossen',
+  '❌ Pipeline mit Fehler beendet',
+  '🛑 Pipeline abgebrochen',
+]);
 const STREAM_TIMESTAMP_LOCALE = 'de-DE';
 
 function isStepId(value: unknown): value is StepId {
@@ -273,11 +283,18 @@ function formatDateInput(date: Date | null) {
 
 function buildEditableItems(rawItems: RawOcrItem[], year: number): EditableOcrItem[] {
   return rawItems.map((item, index) => {
-    const priceInfo = parsePrice(item.price);
-    const parsedDate = parseDateWithYear(item.date, year);
+    // Typisierte Werte aus der Pipeline bevorzugen, Rohtexte nur für ältere Records parsen
+    const parsedPrice = parsePrice(item.price);
+    const priceInfo = {
+      amount: typeof item.amount === 'number' ? item.amount : parsedPrice.amount,
+      type: item.type === 'income' || item.type === 'expense' ? item.type : parsedPrice.type,
+    };
+    const dateISO =
+      typeof item.date_iso === 'string' ? item.date_iso : formatDateInput(parseDateWithYear(item.date, year));
 
     return {
       id: generateItemId(index),
+      fingerprint: item.fingerprint,
       index,
       include: true,
       error: undefined,
@@ -290,7 +307,7 @@ function buildEditableItems(rawItems: RawOcrItem[], year: number): EditableOcrIt
       priceValue: priceInfo.amount,
       type: priceInfo.type,
       dateRaw: item.date ?? '',
-      dateISO: formatDateInput(parsedDate),
+      dateISO,
       dateEdited: false,
     };
   });
@@ -518,9 +535,30 @@ function buildSummaryData(logs: LogEntry[]): SummaryData {
           ...existing,
           items: dedupedItems,
         };
+      } else if (log.message === '🎨 Preisfarben klassifiziert') {
+        // Typ und Vorzeichen kommen gesammelt nach dem Lesen aller Items
+        const typesValue = data?.types;
+        const pricesValue = data?.prices;
+        const types = Array.isArray(typesValue) ? typesValue : [];
+        const prices = Array.isArray(pricesValue) ? pricesValue : [];
+        const existing = next.ocr ?? {};
+        next.ocr = {
+          ...existing,
+          items: (existing.items ?? []).map((item) => {
+            const typeRaw = types[item.index - 1];
+            const priceRaw = prices[item.index - 1];
+            return {
+              ...item,
+              type: typeRaw === 'income' || typeRaw === 'expense' ? typeRaw : item.type,
+              price: typeof priceRaw === 'string' ? priceRaw.trim() : item.price,
+            };
+          }),
+        };
       } else if (log.message === '✅ OCR Pipeline abgeschlossen') {
         const ts = Date.now();
-        const resultImageUrl = `/api/process/media/ocr_result.png?ts=${ts}`;
+        // Ohne Debug-Ausgabe (Low-Memory, Karten-Modus) gibt es kein Ergebnisbild
+        const resultImageUrl =
+          data?.result_image === false ? undefined : `/api/process/media/ocr_result.png?ts=${ts}`;
         const totalItemsValue = data?.total_items;
         next.ocr = {
           ...next.ocr,
@@ -622,6 +660,8 @@ const STATUS_STYLES: Record<StepStatus, string> = {
 export default function ProcessPage() {
   const router = useRouter();
   const eventSourceRef = useRef<EventSource | null>(null);
+  // Job, an dem dieser Tab hängt (aus dem ersten "job"-Event des Streams)
+  const attachedJobIdRef = useRef<string | null>(null);
 
   const [logs, setLogs] = useState<LogEntry[]>([]);
   const [isRunning, setIsRunning] = useState(false);
@@ -775,6 +815,7 @@ export default function ProcessPage() {
         body: JSON.stringify({
           items: candidates.map((item) => ({
             id: item.id,
+            fingerprint: item.fingerprint,
             name: item.name.trim(),
             category: item.category.trim(),
             tag: item.tag.trim(),
@@ -849,29 +890,31 @@ export default function ProcessPage() {
     }
   }, []);
 
-  useEffect(() => {
-    loadLatestLogs();
-    loadOcrItems();
-    return () => {
-      closeEventSource();
-    };
-  }, [closeEventSource, loadLatestLogs, loadOcrItems]);
-
-  const handleStartPipeline = useCallback(() => {
-    if (isRunning) return;
-
+  // Verbindet sich mit dem Job-Stream; läuft schon ein Job, hängt der Server uns an ihn an
+  const attachToPipeline = useCallback((url: string) => {
     closeEventSource();
     setFetchError(null);
     setLogs([]);
+    setIsLoading(false);
     setIsRunning(true);
     setItemsError(null);
     setItemsMessage(null);
     setOcrItems([]);
     setIsLoadingItems(true);
 
-    const eventSource = new EventSource('/api/process');
+    attachedJobIdRef.current = null;
+    const eventSource = new EventSource(url);
     eventSourceRef.current = eventSource;
 
+    eventSource.addEventListener('job', (event) => {
+      try {
+        const job = JSON.parse((event as MessageEvent).data) as { id?: string };
+        attachedJobIdRef.current = typeof job.id === 'string' ? job.id : null;
+      } catch {
+        // ohne Job-ID bleibt nur der Abbruch-Button wirkungslos
+      }
+    });
+
     eventSource.onmessage = (event) => {
       try {
         const parsed = JSON.parse(event.data) as LogEntry;
@@ -904,7 +947,53 @@ export default function ProcessPage() {
       setIsLoadingItems(false);
       closeEventSource();
     };
-  }, [closeEventSource, isRunning, loadLatestLogs, loadOcrItems]);
+  }, [closeEventSource, loadLatestLogs, loadOcrItems]);
+
+  useEffect(() => {
+    let cancelled = false;
+    const init = async () => {
+      // Läuft bereits ein Job (z.B. aus einem anderen Tab), dessen Stream übernehmen
+      try {
+        const response = await fetch('/api/process?status=1', { cache: 'no-store' });
+        const status = response.ok ? await response.json() : null;
+        const activeJob = status?.current ?? status?.queued;
+        if (!cancelled && activeJob?.id) {
+          attachToPipeline(`/api/process?job=${encodeURIComponent(activeJob.id)}`);
+          return;
+        }
+      } catch {
+        // Status nicht verfügbar → wie bisher die letzten Logs laden
+      }
+      if (!cancelled) {
+        loadLatestLogs();
+        loadOcrItems();
+      }
+    };
+    init();
+    return () => {
+      cancelled = true;
+      closeEventSource();
+    };
+  }, [attachToPipeline, closeEventSource, loadLatestLogs, loadOcrItems]);
+
+  const handleStartPipeline = useCallback(() => {
+    if (isRunning) return;
+    attachToPipeline('/api/process');
+  }, [attachToPipeline, isRunning]);
+
+  const handleCancelPipeline = useCallback(async () => {
+    // Genau den Job abbrechen, dessen Logs hier laufen – nicht irgendeinen aktuellen
+    const jobId = attachedJobIdRef.current;
+    if (!jobId) return;
+    try {
+      const response = await fetch(`/api/process?job=${encodeURIComponent(jobId)}`, { method: 'DELETE' });
+      if (!response.ok) {
+        throw new Error('Pipeline konnte nicht abgebrochen werden');
+      }
+    } catch (error: unknown) {
+      setFetchError(error instanceof Error ? error.message : 'Pipeline konnte nicht abgebrochen werden');
+    }
+  }, []);
 
   const pipelineState = useMemo(() => derivePipelineState(logs), [logs]);
 
@@ -971,6 +1060,7 @@ export default function ProcessPage() {
           ocrSummary={ocrSummary}
           onOpenOcrPreview={() => setIsOcrPreviewOpen(true)}
           onStartPipeline={handleStartPipeline}
+          onCancelPipeline={handleCancelPipeline}
           onNavigateDashboard={() => router.push('/')}
           isPipelineRunning={isRunning}
           headerStatus={headerStatus}
@@ -27,6 +27,7 @@ interface ProcessMonitorHeaderProps {
   ocrSummary?: OcrSummary;
   onOpenOcrPreview: () => void;
   onStartPipeline: () => void;
+  onCancelPipeline?: () => void;
   onNavigateDashboard: () => void;
   isPipelineRunning: boolean;
   headerStatus: HeaderStatus;
@@ -53,6 +54,7 @@ export function ProcessMonitorHeader({
   ocrSummary,
   onOpenOcrPreview,
   onStartPipeline,
+  onCancelPipeline,
   onNavigateDashboard,
   isPipelineRunning,
   headerStatus,
@@ -145,6 +147,16 @@ export function ProcessMonitorHeader({
             🚀 OCR starten
           </button>
 
+          {isPipelineRunning && onCancelPipeline && (
+            <button
+              type="button"
+              onClick={onCancelPipeline}
+              className="rounded-full border border-rose-300 bg-rose-50 px-5 py-2 text-xs font-semibold uppercase tracking-[0.35em] text-rose-700 transition-colors duration-300 hover:border-rose-400 hover:bg-rose-100"
+            >
+              🛑 Abbrechen
+            </button>
+          )}
+
           <button
             type="button"
             onClick={onNavigateDashboard}
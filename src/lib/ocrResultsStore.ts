@@ -0,0 +1,82 @@
+// src/lib/ocrResultsStore.ts
+// Lesezugriff auf den append-only OCR-Store (data/ocr-results.jsonl + Index).
+// Geschrieben wird der Store von src/python/results_store.py.
+import path from 'path';
+import fs from 'fs';
+
+const dataDir = path.join(process.cwd(), 'data');
+const resultsFile = path.join(dataDir, 'ocr-results.jsonl');
+const indexFile = path.join(dataDir, 'ocr-results.index.json');
+const importedFile = path.join(dataDir, 'ocr-imported.jsonl');
+
+export type OcrRun = {
+  run_id: string;
+  captured_at: string;
+  source: string;
+  offset: number;
+  length: number;
+  count: number;
+};
+
+export type OcrRecord = {
+  run_id: string;
+  captured_at: string;
+  position: number;
+  fingerprint: string;
+  [field: string]: unknown;
+};
+
+export async function readRunIndex(): Promise<OcrRun[]> {
+  if (!fs.existsSync(indexFile)) return [];
+  const parsed = JSON.parse(await fs.promises.readFile(indexFile, 'utf-8'));
+  return Array.isArray(parsed?.runs) ? parsed.runs : [];
+}
+
+// Liest nur den Byte-Bereich [offset, offset + length) statt der ganzen Historie
+async function readRange(offset: number, length: number): Promise<OcrRecord[]> {
+  if (length <= 0) return [];
+  const handle = await fs.promises.open(resultsFile, 'r');
+  try {
+    const buffer = Buffer.alloc(length);
+    await handle.read(buffer, 0, length, offset);
+    return buffer
+      .toString('utf-8')
+      .split('\n')
+      .filter((line) => line.trim())
+      .map((line) => JSON.parse(line) as OcrRecord);
+  } finally {
+    await handle.close();
+  }
+}
+
+export async function readRuns(runs: OcrRun[]): Promise<OcrRecord[]> {
+  if (!runs.length) return [];
+  // Runs liegen in Append-Reihenfolge hintereinander → ein zusammenhängender Lesevorgang
+  const start = runs[0].offset;
+  const last = runs[runs.length - 1];
+  return readRange(start, last.offset + last.length - start);
+}
+
+export async function readImportedFingerprints(): Promise<Set<string>> {
+  const fingerprints = new Set<string>();
+  if (!fs.existsSync(importedFile)) return fingerprints;
+  const content = await fs.promises.readFile(importedFile, 'utf-8');
+  for (const line of content.split('\n')) {
+    if (!line.trim()) continue;
+    try {
+      const entry = JSON.parse(line);
+      if (typeof entry?.fingerprint === 'string') fingerprints.add(entry.fingerprint);
+    } catch {
+      // kaputte Zeile ignorieren
+    }
+  }
+  return fingerprints;
+}
+
+export async function appendImportedFingerprints(fingerprints: string[]) {
+  if (!fingerprints.length) return;
+  await fs.promises.mkdir(dataDir, { recursive: true });
+  const importedAt = new Date().toISOString();
+  const lines = fingerprints.map((fingerprint) => JSON.stringify({ fingerprint, imported_at: importedAt }));
+  await fs.promises.appendFile(importedFile, lines.join('\n') + '\n', 'utf-8');
+}
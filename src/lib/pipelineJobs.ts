@@ -0,0 +1,272 @@
+// src/lib/pipelineJobs.ts
+// Single-Flight-Scheduler für die Python-Pipeline (src/python/main.py).
+// Es läuft immer höchstens ein Job; gleichzeitige Anfragen hängen sich an den
+// laufenden Job und bekommen dessen LOG:-Events aus einem Replay-Puffer.
+import { spawn, type ChildProcess } from 'child_process';
+import path from 'path';
+import fs from 'fs';
+
+export type JobStatus = 'queued' | 'running' | 'done' | 'failed' | 'cancelled';
+
+// attach: an laufenden Job anhängen, sonst starten (Standard)
+// queue:  neuen Lauf nach dem aktuellen einreihen (max. ein wartender Job)
+// reject: ablehnen, solange ein Job läuft
+export type JobPolicy = 'attach' | 'queue' | 'reject';
+
+export type JobEvent = { seq: number; json: string };
+
+type Subscriber = {
+  onEvent: (event: JobEvent) => void;
+  onEnd: () => void;
+};
+
+export type PipelineJob = {
+  id: string;
+  status: JobStatus;
+  createdAt: string;
+  startedAt?: string;
+  finishedAt?: string;
+  exitCode?: number | null;
+  // Replay-Puffer: events[0] hat die Sequenznummer firstSeq
+  events: string[];
+  firstSeq: number;
+  subscribers: Set<Subscriber>;
+  process?: ChildProcess;
+  killTimer?: ReturnType<typeof setTimeout>;
+  watchdog?: ReturnType<typeof setTimeout>;
+};
+
+export type JobSummary = Pick<PipelineJob, 'id' | 'status' | 'createdAt' | 'startedAt' | 'finishedAt' | 'exitCode'> & {
+  events: number;
+  subscribers: number;
+};
+
+const MAX_REPLAY_EVENTS = 5000;
+const CANCEL_GRACE_MS = 10_000;
+// main.py hält sich selbst an DEFAULT_DEADLINE_S (300 s); der Watchdog ist die harte Obergrenze
+const MAX_JOB_RUNTIME_MS = 360_000;
+
+const logDir = path.join(process.cwd(), 'data');
+const logFile = path.join(logDir, 'process-log.jsonl');
+const pythonDir = path.join(process.cwd(), 'src', 'python');
+const pythonScriptPath = path.join(pythonDir, 'main.py');
+const pythonExecutable = path.join(process.cwd(), '.venv', 'bin', 'python');
+
+type SchedulerState = {
+  current: PipelineJob | null;
+  queued: PipelineJob | null;
+  last: PipelineJob | null;
+  counter: number;
+};
+
+// Auf globalThis, damit Dev-Reloads (HMR) keinen zweiten Scheduler erzeugen
+const globalScope = globalThis as typeof globalThis & { __pipelineScheduler?: SchedulerState };
+const state: SchedulerState =
+  globalScope.__pipelineScheduler ?? (globalScope.__pipelineScheduler = { current: null, queued: null, last: null, counter: 0 });
+
+async function persist(json: string) {
+  try {
+    await fs.promises.mkdir(logDir, { recursive: true });
+    await fs.promises.appendFile(logFile, json + '\n', 'utf-8');
+  } catch {
+    // Schreibfehler ignorieren, damit der SSE-Stream nicht abbricht
+  }
+}
+
+function createJob(): PipelineJob {
+  state.counter += 1;
+  return {
+    id: `${Date.now().toString(36)}-${state.counter}`,
+    status: 'queued',
+    createdAt: new Date().toISOString(),
+    events: [],
+    firstSeq: 0,
+    subscribers: new Set(),
+  };
+}
+
+function record(job: PipelineJob, json: string) {
+  const seq = job.firstSeq + job.events.length;
+  job.events.push(json);
+  if (job.events.length > MAX_REPLAY_EVENTS) {
+    job.events.shift();
+    job.firstSeq += 1;
+  }
+  persist(json);
+  job.subscribers.forEach((subscriber) => subscriber.onEvent({ seq, json }));
+}
+
+function recordLog(job: PipelineJob, level: string, message: string, data?: Record<string, unknown>) {
+  record(job, JSON.stringify({ level, message, timestamp: new Date().toISOString(), data: { jobId: job.id, ...data } }));
+}
+
+function finish(job: PipelineJob, status: JobStatus, exitCode: number | null) {
+  if (job.killTimer) clearTimeout(job.killTimer);
+  if (job.watchdog) clearTimeout(job.watchdog);
+  job.status = status;
+  job.exitCode = exitCode;
+  job.finishedAt = new Date().toISOString();
+  job.process = undefined;
+
+  const messages: Record<string, [string, string]> = {
+    done: ['info', '✅ Pipeline abgeschlossen'],
+    failed: ['error', '❌ Pipeline mit Fehler beendet'],
+    cancelled: ['warning', '🛑 Pipeline abgebrochen'],
+  };
+  const [level, message] = messages[status];
+  recordLog(job, level, message, { exitCode });
+
+  job.subscribers.forEach((subscriber) => subscriber.onEnd());
+  job.subscribers.clear();
+
+  if (state.current === job) {
+    state.current = null;
+    state.last = job;
+  } else if (state.queued === job) {
+    state.queued = null;
+    state.last = job;
+  }
+
+  const next = state.queued;
+  if (next && !state.current) {
+    state.queued = null;
+    start(next);
+  }
+}
+
+function start(job: PipelineJob) {
+  state.current = job;
+  job.status = 'running';
+  job.startedAt = new Date().toISOString();
+
+  // Python-Prozess starten mit unbuffered output (-u flag)
+  const child = spawn(pythonExecutable, ['-u', pythonScriptPath], {
+    cwd: pythonDir,
+    stdio: ['ignore', 'pipe', 'pipe'],
+    env: { ...process.env, PYTHONUNBUFFERED: '1' },
+  });
+  job.process = child;
+  job.watchdog = setTimeout(() => {
+    recordLog(job, 'error', '⏱️ Pipeline hat die maximale Laufzeit überschritten', { maxRuntimeMs: MAX_JOB_RUNTIME_MS });
+    cancelJob(job.id);
+  }, MAX_JOB_RUNTIME_MS);
+
+  // STDOUT zeilenweise verarbeiten; Chunks können mitten in einer Zeile enden
+  let pending = '';
+  const handleLine = (line: string) => {
+    const trimmed = line.trim();
+    if (!trimmed) return;
+    if (trimmed.startsWith('LOG:')) {
+      record(job, trimmed.substring(4).trim());
+    } else {
+      recordLog(job, 'debug', 'Python Output', { output: line });
+    }
+  };
+
+  child.stdout?.on('data', (data: Buffer) => {
+    const lines = (pending + data.toString()).split('\n');
+    pending = lines.pop() ?? '';
+    lines.forEach(handleLine);
+  });
+
+  // STDERR verarbeiten (für Python Errors)
+  child.stderr?.on('data', (data: Buffer) => {
+    recordLog(job, 'error', 'Python Error', { error: data.toString() });
+  });
+
+  child.on('error', (error) => {
+    recordLog(job, 'error', 'Python Error', { error: error.message });
+  });
+
+  child.on('close', (code) => {
+    if (pending) handleLine(pending);
+    pending = '';
+    if (job.status !== 'running') return;
+    finish(job, job.killTimer ? 'cancelled' : code === 0 ? 'done' : 'failed', code);
+  });
+}
+
+export function requestJob(policy: JobPolicy = 'attach'): { job: PipelineJob; deduped: boolean } | { rejected: PipelineJob } {
+  const running = state.current;
+  if (!running) {
+    const job = createJob();
+    start(job);
+    return { job, deduped: false };
+  }
+  if (policy === 'reject') {
+    return { rejected: running };
+  }
+  if (policy === 'attach') {
+    return { job: running, deduped: true };
+  }
+  // queue: ein wartender Job reicht, weitere Anfragen teilen ihn sich
+  if (state.queued) {
+    return { job: state.queued, deduped: true };
+  }
+  const job = createJob();
+  state.queued = job;
+  recordLog(job, 'info', '⏳ Pipeline eingereiht', { waitingFor: running.id });
+  return { job, deduped: false };
+}
+
+export function findJob(id: string): PipelineJob | null {
+  return [state.current, state.queued, state.last].find((job) => job?.id === id) ?? null;
+}
+
+// Replay ab fromSeq, danach live; gibt eine Abmelde-Funktion zurück
+export function subscribe(
+  job: PipelineJob,
+  fromSeq: number,
+  onEvent: Subscriber['onEvent'],
+  onEnd: Subscriber['onEnd'],
+): () => void {
+  const startIndex = Math.max(0, fromSeq - job.firstSeq);
+  job.events.slice(startIndex).forEach((json, offset) => onEvent({ seq: job.firstSeq + startIndex + offset, json }));
+
+  if (job.status !== 'queued' && job.status !== 'running') {
+    onEnd();
+    return () => {};
+  }
+  const subscriber: Subscriber = { onEvent, onEnd };
+  job.subscribers.add(subscriber);
+  return () => {
+    job.subscribers.delete(subscriber);
+  };
+}
+
+export function cancelJob(id?: string | null): PipelineJob | null {
+  const job = id ? findJob(id) : state.current;
+  if (!job) return null;
+
+  if (job.status === 'queued') {
+    finish(job, 'cancelled', null);
+  } else if (job.status === 'running' && job.process && !job.killTimer) {
+    // SIGTERM → main.py bricht sauber ab; hängt der Prozess, nach der Schonfrist hart beenden
+    recordLog(job, 'warning', '🛑 Abbruch angefordert');
+    job.killTimer = setTimeout(() => job.process?.kill('SIGKILL'), CANCEL_GRACE_MS);
+    job.process.kill('SIGTERM');
+  }
+  return job;
+}
+
+export function summarizeJob(job: PipelineJob | null): JobSummary | null {
+  if (!job) return null;
+  return {
+    id: job.id,
+    status: job.status,
+    createdAt: job.createdAt,
+    startedAt: job.startedAt,
+    finishedAt: job.finishedAt,
+    exitCode: job.exitCode,
+    events: job.firstSeq + job.events.length,
+    subscribers: job.subscribers.size,
+  };
+}
+
+export function schedulerStatus() {
+  return {
+    current: summarizeJob(state.current),
+    queued: summarizeJob(state.queued),
+    last: summarizeJob(state.last),
+  };
+}
@@ -10,6 +10,9 @@ import traceback
 from datetime import datetime, UTC
 from PIL import Image, ImageChops
 import numpy as np
+from scroll_overlap import CROP_BOTTOM_OFFSET, SCROLL_AMOUNT, measure_scroll_overlap, next_scroll_amount
+from memory_monitor import track_stage
+from deadline import expired, record_degradation
 from Quartz import (
     CGWindowListCopyWindowInfo,
     kCGWindowListOptionOnScreenOnly,
@@ -41,13 +44,11 @@ def log(level: str, message: str, step: str | None = STEP_NAME, **data):
 
 
 # === KONFIGURATION ===
-# Crop-Konstanten - nur unten abschneiden, Rest behalten
-CROP_BOTTOM_OFFSET = 1  # Schneide nur 1 Pixel unten ab
+# Crop-Konstante, Scroll-Regelung und Replay-Quelle liegen plattformfrei in scroll_overlap.py
 
 # Screenshot-Einstellungen
 MAX_FRAMES = 20
 DELAY = 0.7
-SCROLL_AMOUNT = 700
 
 
 def hide_browser_show_finanzguru():
@@ -150,15 +151,15 @@ def capture_region_hq(x, y, w, h, out_path):
         raise
 
 
-def scroll_down(x, y, w, h):
-    """Bewegt Maus in Fenstermitte und scrollt um SCROLL_AMOUNT Pixel nach unten."""
+def scroll_down(x, y, w, h, amount=SCROLL_AMOUNT):
+    """Bewegt Maus in Fenstermitte und scrollt um amount Pixel nach unten."""
     try:
         mid_x, mid_y = x + w//2, y + h//2
         log("info", "🖱️ Bewege Maus zu Fenstermitte", x=mid_x, y=mid_y)
         pyautogui.moveTo(mid_x, mid_y, duration=0.2)
         
-        log("info", "⏬ Scrolle nach unten", pixels=SCROLL_AMOUNT)
-        ev = CGEventCreateScrollWheelEvent(None, kCGScrollEventUnitPixel, 1, SCROLL_AMOUNT)
+        log("info", "⏬ Scrolle nach unten", pixels=amount)
+        ev = CGEventCreateScrollWheelEvent(None, kCGScrollEventUnitPixel, 1, amount)
         if ev is None:
             raise RuntimeError("CGEventCreateScrollWheelEvent hat None zurückgegeben")
         CGEventPost(kCGHIDEventTap, ev)
@@ -168,6 +169,15 @@ def scroll_down(x, y, w, h):
         raise
 
 
+def live_frame_source(x, y, w, h):
+    """Frame-Quelle für das echte Finanzguru-Fenster (screencapture + Scroll-Events)."""
+    return {
+        "capture": lambda out_path: capture_region_hq(x, y, w, h, out_path),
+        "scroll": lambda amount: scroll_down(x, y, w, h, amount),
+        "delay": DELAY,
+    }
+
+
 def has_changed(img1_path, img2_path, compare_height=200, threshold=20000):
     """Vergleicht die unteren compare_height Pixel von zwei Screenshots."""
     try:
@@ -201,6 +211,7 @@ def has_changed(img1_path, img2_path, compare_height=200, threshold=20000):
 def crop_all_images(shots_path, cropped_path):
     """
     Croppt Screenshots: entfernt unteren Rand (CROP_BOTTOM_OFFSET px).
+    Nur noch für Artefakte nötig – das Stitching croppt beim Laden selbst.
 
     shots_path: Verzeichnis mit Original-Bildern (shot_XXX.png)
     cropped_path: Zielverzeichnis für cropped_XXX.png Dateien
@@ -220,10 +231,8 @@ def crop_all_images(shots_path, cropped_path):
                     log("error", "❌ Konnte Bild nicht laden", filename=img_filename)
                     continue
                     
-                # Nur unten abschneiden, alles andere behalten
-                original_height = img.shape[0]
-                new_bottom = original_height - CROP_BOTTOM_OFFSET
-                cropped = img[0:new_bottom, :]  # Von oben bis new_bottom, alle Spalten
+                # Nur unten abschneiden, alles andere behalten (gleiche Regel wie beim Stitchen)
+                cropped = img[:img.shape[0] - CROP_BOTTOM_OFFSET]
                 
                 # Gecropptes Bild speichern
                 filename = f"cropped_{i:03d}.png"
@@ -242,30 +251,50 @@ def crop_all_images(shots_path, cropped_path):
 
 
 
-def capture_and_crop_screenshots(shots_path, cropped_path):
+def capture_and_crop_screenshots(shots_path, cropped_path=None, frame_source=None):
+    """
+    Nimmt scrollend Screenshots auf. Ohne frame_source wird das Finanzguru-Fenster
+    live aufgenommen, sonst z.B. aus replay_frame_source. Gecroppte Kopien werden
+    nur geschrieben, wenn cropped_path angegeben ist (Artefakte).
+    Gibt das Fenster (x, y, w, h) zurück.
+    """
+    live = frame_source is None
+    browser_hidden = False
     try:
         log("info", "🚀 Starte Capture & Crop Pipeline")
 
-        # Browser verstecken und Finanzguru aktivieren
-        hide_browser_show_finanzguru()
-        time.sleep(0.3)  # Kurz warten bis Fenster gewechselt haben
-        x, y, w, h = find_finanzguru_window() #hier wird wirklich gespeichert
-        
+        if live:
+            # Browser verstecken und Finanzguru aktivieren
+            browser_hidden = True
+            hide_browser_show_finanzguru()
+            time.sleep(0.3)  # Kurz warten bis Fenster gewechselt haben
+            x, y, w, h = find_finanzguru_window() #hier wird wirklich gespeichert
+            frame_source = live_frame_source(x, y, w, h)
+        else:
+            x, y, w, h = frame_source["window"]
+
         # Summary: Finanzguru-Fenster (für Dashboard)
         log("summary", "🖥️ Finanzguru-Fenster", x=x, y=y, width=w, height=h)
         
-        time.sleep(0.5)
+        if live:
+            time.sleep(0.5)
 
         prev_path = None
+        prev_img = None
         total_shots = 0
+        scroll_amount = SCROLL_AMOUNT
 
         for i in range(MAX_FRAMES):
+            # Zeitbudget erschöpft → mit den bisherigen Frames weiterarbeiten
+            if i > 0 and expired():
+                record_degradation("capture_truncated", frames=total_shots, max_frames=MAX_FRAMES)
+                break
             try:
                 path = os.path.join(shots_path, f"shot_{i:03d}.png")
                 log("info", "🎬 Starte Screenshot-Aufnahme", index=i, frame=f"{i+1}/{MAX_FRAMES}")
                 
                 # speichert die Screenshots in shots_path/
-                capture_region_hq(x, y, w, h, path)
+                frame_source["capture"](path)
                 log("info", "📸 Screenshot aufgenommen", index=i, filename=f"shot_{i:03d}.png")
 
                 if prev_path:
@@ -279,11 +308,28 @@ def capture_and_crop_screenshots(shots_path, cropped_path):
                         break
                     else:
                         log("info", "✅ Neuer Inhalt erkannt, weiter scrollen")
-                
+
+                # Überlappung zum vorherigen Frame messen und nächste Scrollweite anpassen
+                img = cv2.imread(path)
+                if prev_img is not None and img is not None:
+                    shift_px, overlap_px, score = measure_scroll_overlap(prev_img, img)
+                    new_amount = next_scroll_amount(scroll_amount, shift_px, img.shape[0], score)
+                    log(
+                        "info",
+                        "📏 Überlappung gemessen",
+                        shift_px=int(shift_px),
+                        overlap_px=int(overlap_px),
+                        match_score=f"{score*100:.1f}%",
+                        scroll_amount=scroll_amount,
+                        next_scroll_amount=new_amount,
+                    )
+                    scroll_amount = new_amount
+                prev_img = img
+
                 # scrollt
-                scroll_down(x, y, w, h)
+                frame_source["scroll"](scroll_amount)
                 log("info", "⏬ Gescrollt, warte auf nächsten Screenshot")
-                time.sleep(DELAY)
+                time.sleep(frame_source["delay"])
                 prev_path = path
                 total_shots += 1
             except Exception as e:
@@ -292,18 +338,22 @@ def capture_and_crop_screenshots(shots_path, cropped_path):
 
         log("info", "📸 Screenshot-Aufnahme abgeschlossen", total_shots=total_shots)
         # Browser wiederherstellen
-        restore_browser()
-        # Automatisches Cropping - speichert in cropped_path/
-        crop_all_images(shots_path, cropped_path)
+        if browser_hidden:
+            restore_browser()
+            browser_hidden = False
+        # Cropping passiert beim Stitchen als Slice; nur für Artefakte auf die Platte schreiben
+        if cropped_path:
+            with track_stage("crop"):
+                crop_all_images(shots_path, cropped_path)
         log("info", "✅ Capture & Crop erfolgreich abgeschlossen")
+        return x, y, w, h
     except Exception as e:
         log("error", "❌ Capture & Crop Pipeline fehlgeschlagen", error=str(e), traceback=traceback.format_exc())
-        # Versuche trotzdem Browser wiederherzustellen
-        try:
-            restore_browser()
-        except:
-            pass
         raise
+    finally:
+        # Auch bei Fehlern und bei Abbruch per SIGTERM (PipelineCancelled ist keine Exception)
+        if browser_hidden:
+            restore_browser()
 
 
 
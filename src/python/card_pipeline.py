@@ -0,0 +1,305 @@
+import hashlib
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, UTC
+
+import cv2
+import numpy as np
+
+from deadline import expired, record_degradation
+from layout_profile import LAYOUT_CACHE_PATH, get_layout_profile, save_widened_profile, window_key
+from ocr_extract import (
+    CARD_MIN_AREA,
+    classify_item_types,
+    configure_tesseract,
+    prepare_planes,
+    provisional_type,
+    read_card,
+    read_card_date,
+    read_first_date,
+    update_skipped_fields,
+)
+from stitch_overlap import TEMPLATE_HEIGHT, find_top_border, load_frame, match_template_y
+
+
+# === LOGGING HELPER ===
+STEP_NAME = "ocr"
+
+
+def log(level: str, message: str, step: str | None = STEP_NAME, **data):
+    """Strukturiertes Logging für SSE Stream."""
+    payload = {
+        "level": level,
+        "message": message,
+        "timestamp": datetime.now(UTC).isoformat().replace("+00:00", "Z"),
+    }
+    if step:
+        payload["step"] = step
+    if data:
+        payload["data"] = data
+    print("LOG:", json.dumps(payload, ensure_ascii=False))
+    sys.stdout.flush()
+
+
+# === KONFIGURATION ===
+THUMB_SCALE = 2  # Vorschaubild für den unscharfen Vergleich: halbe Auflösung
+PIXEL_DIFF_LEVEL = 40  # Grauwert-Abweichung, ab der ein Vorschau-Pixel als verschieden zählt
+MAX_DIFF_PIXELS = 10  # so viele verschiedene Pixel gelten noch als Rendering-Rauschen
+SIZE_TOLERANCE = 4  # Pixel Abweichung bei Breite/Höhe derselben Karte
+POSITION_TOLERANCE = 6  # Pixel Abweichung der globalen y-Position derselben Karte
+MIN_ALIGN_SCORE = 0.8  # Template-Match, ab dem ein Frame ohne gemeinsame Karte ausgerichtet wird
+CARD_WORKERS = 4  # Frames, die parallel geladen und vorverarbeitet werden
+
+
+def card_identity(gray, x, y, w, h):
+    """
+    Pixel-Hash (exakt) und verkleinertes Vorschaubild einer Karte. Beim Scrollen um
+    ganze Pixel sind Aufnahmen derselben Karte identisch; das Vorschaubild fängt
+    Rendering-Rauschen ab, ohne dass sich Karten mit einer anderen Ziffer gleichen.
+    """
+    crop = np.ascontiguousarray(gray[y:y + h, x:x + w])
+    thumb = cv2.resize(crop, (max(1, w // THUMB_SCALE), max(1, h // THUMB_SCALE)), interpolation=cv2.INTER_AREA)
+    return hashlib.sha1(crop.tobytes()).hexdigest(), thumb
+
+
+def _same_card(a, b):
+    if abs(a["w"] - b["w"]) > SIZE_TOLERANCE or abs(a["h"] - b["h"]) > SIZE_TOLERANCE:
+        return False
+    if a["hash"] == b["hash"]:
+        return True
+    rows = min(a["thumb"].shape[0], b["thumb"].shape[0])
+    cols = min(a["thumb"].shape[1], b["thumb"].shape[1])
+    # Nicht der Mittelwert: der weiße Kartenhintergrund würde eine andere Ziffer verschlucken
+    diff = cv2.absdiff(a["thumb"][:rows, :cols], b["thumb"][:rows, :cols])
+    return int(np.count_nonzero(diff > PIXEL_DIFF_LEVEL)) <= MAX_DIFF_PIXELS
+
+
+def detect_frame(path, crop_bottom=0):
+    """
+    Lädt ein Frame, berechnet die OCR-Ebenen und findet vollständig sichtbare Karten
+    (gleiche Threshold-253-Konturen wie ocr_extract). Angeschnittene Karten am oberen
+    oder unteren Rand werden ignoriert – sie sind im Nachbar-Frame vollständig.
+    """
+    planes = prepare_planes(load_frame(path, crop_bottom))
+    frame_h = planes["gray"].shape[0]
+    contours, _ = cv2.findContours(planes["thresh"], cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    cards = []
+    for contour in contours:
+        if cv2.contourArea(contour) <= CARD_MIN_AREA:
+            continue
+        x, y, w, h = cv2.boundingRect(contour)
+        if y <= 0 or y + h >= frame_h:
+            continue
+        digest, thumb = card_identity(planes["gray"], x, y, w, h)
+        cards.append({"x": x, "y": y, "w": w, "h": h, "hash": digest, "thumb": thumb})
+    cards.sort(key=lambda card: card["y"])
+    return planes, cards
+
+
+def match_frame_shift(prev_cards, new_cards):
+    """
+    Scroll-Verschiebung (prev_y - new_y) zwischen zwei Frames: die Verschiebung, unter
+    der die meisten Karten beider Frames übereinstimmen. None ohne Überlappung.
+    Bei Gleichstand (z.B. zwei identische Buchungen) gewinnt die kleinere Verschiebung.
+    """
+    buckets = {}
+    for prev in prev_cards:
+        for new in new_cards:
+            shift = prev["y"] - new["y"]
+            if shift > 0 and _same_card(prev, new):
+                buckets.setdefault(round(shift / POSITION_TOLERANCE), []).append(shift)
+    if not buckets:
+        return None
+    best = max(buckets.values(), key=lambda shifts: (len(shifts), -min(shifts)))
+    return int(np.median(best))
+
+
+def align_by_template(prev_tail, gray):
+    """
+    Fallback ohne gemeinsame vollständige Karte: Verschiebung über das untere Ende des
+    vorherigen Frames (wie die Überlappungsmessung der Capture-Phase). None, wenn unsicher.
+    """
+    if prev_tail is None:
+        return None
+    template_start_y, match_y, score = match_template_y(prev_tail["rows"], gray, TEMPLATE_HEIGHT)
+    if score < MIN_ALIGN_SCORE:
+        return None
+    return prev_tail["offset"] + template_start_y - match_y
+
+
+def header_source(planes, y, prev_planes, prev_y, profile):
+    """
+    Frame, in dem die Datums-Überschrift über einer Karte vollständig liegt: das
+    aktuelle oder – bei einer Karte knapp unter der Oberkante – das vorherige, in
+    dem die Karte unten angeschnitten war. Gibt (planes, y der Karte) oder (None, None).
+    """
+    _, dy, dh, _, _, _ = profile["anchors"]["date"]
+    for source, card_y in ((planes, y), (prev_planes, prev_y)):
+        if source is not None and 0 <= card_y + dy and card_y + dy + dh <= source["gray"].shape[0]:
+            return source, card_y
+    return None, None
+
+
+def _frame_stream(frame_paths, crop_bottom, workers):
+    """Erkennung parallel, Ergebnisse in Frame-Reihenfolge; nur `workers` Frames im Voraus."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for path in frame_paths:
+            pending.append(pool.submit(detect_frame, path, crop_bottom))
+            if len(pending) > workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def ocr_cards(
+    frames_path,
+    debug_path,
+    window_size=None,
+    crop_bottom=0,
+    layout_cache_path=LAYOUT_CACHE_PATH,
+    workers=CARD_WORKERS,
+):
+    """
+    Stitch-freie OCR: erkennt Karten direkt in jedem Frame, führt Duplikate aus
+    überlappenden Frames über Hash und globale Position zusammen und liest jede
+    eindeutige Karte genau einmal. Frames werden nacheinander verarbeitet und wieder
+    freigegeben – das lange Bild entsteht nie. Liefert dieselben Items wie ocr_extract.
+    """
+    frame_paths = [os.path.join(frames_path, f) for f in sorted(os.listdir(frames_path)) if f.endswith(".png")]
+    log("info", "🃏 Starte Karten-Modus (ohne Stitching)", frames=len(frame_paths), workers=workers)
+    configure_tesseract()
+    os.makedirs(debug_path, exist_ok=True)
+    # Kein annotiertes Ergebnisbild in diesem Modus – eins aus einem Stitch-Lauf wäre veraltet
+    result_path = os.path.join(debug_path, "ocr_result.png")
+    if os.path.exists(result_path):
+        os.remove(result_path)
+
+    tesseract_stats = {"calls": 0, "seconds": 0.0, "timeouts": 0}
+    skipped_fields = frozenset()
+    profile = None
+
+    items, price_regions = [], []
+    unique_cards = []  # {"w", "h", "hash", "thumb", "global_y"} in Lese-Reihenfolge
+    prev_cards, prev_frame_h, frame_offset = [], 0, 0
+    prev_tail = None  # untere Zeilen des vorherigen Frames für align_by_template
+    prev_planes, prev_offset = None, 0  # für Datums-Überschriften oberhalb des Frames
+    detected = merged = unmatched_frames = 0
+    current_date = ""
+    last_global_y = 0
+    truncated = False
+
+    for index, (planes, cards) in enumerate(_frame_stream(frame_paths, crop_bottom, workers)):
+        frame_h = planes["gray"].shape[0]
+        detected += len(cards)
+
+        # Globale Koordinaten wie im gestitchten Bild: Frame 0 ohne oberen Rand als Ursprung
+        if index == 0:
+            cut_y = find_top_border(planes["bgr"])
+            frame_offset = -cut_y
+        else:
+            shift = match_frame_shift(prev_cards, cards)
+            if shift is None:
+                shift = align_by_template(prev_tail, planes["gray"])
+            if shift is None:
+                unmatched_frames += 1
+                log("warning", "⚠️ Frame ließ sich nicht ausrichten, Karten an der Grenze können fehlen", frame=index)
+                shift = prev_frame_h
+            frame_offset += shift
+
+        if cards and profile is None:
+            profile = get_layout_profile(
+                window_key(window_size, planes["gray"].shape[1]),
+                cards,
+                planes,
+                layout_cache_path,
+            )
+            # Das erste Datum steht im Kopfbereich – nur im ersten Frame sichtbar
+            if index == 0:
+                current_date = read_first_date(planes, profile, tesseract_stats, y_offset=-frame_offset)
+
+        new_cards = []
+        for card in cards:
+            card["global_y"] = frame_offset + card["y"]
+            duplicate = any(
+                abs(known["global_y"] - card["global_y"]) <= POSITION_TOLERANCE and _same_card(known, card)
+                for known in unique_cards
+            )
+            if duplicate:
+                merged += 1
+            else:
+                new_cards.append(card)
+
+        for position, card in enumerate(new_cards):
+            # Zeitbudget: erst optionale Felder streichen, erst danach Karten auslassen
+            if expired():
+                record_degradation("ocr_truncated", processed_items=len(items), frames_done=index)
+                truncated = True
+                break
+            frames_left = len(frame_paths) - index - 1
+            cards_left = len(new_cards) - position + frames_left * max(1, len(new_cards))
+            skipped_fields = update_skipped_fields(cards_left, tesseract_stats, skipped_fields, len(items) + 1)
+
+            x, y, w, h = card["x"], card["y"], card["w"], card["h"]
+            # Datums-Überschrift nur, wenn über der Karte Platz für eine ist (wie ocr_extract)
+            if card["global_y"] - last_global_y > 20 + h:
+                header_planes, header_y = header_source(planes, y, prev_planes, card["global_y"] - prev_offset, profile)
+                if header_planes is None:
+                    log("warning", "⚠️ Datums-Überschrift in keinem Frame sichtbar", frame=index, item=len(items) + 1)
+                else:
+                    new_date = read_card_date(header_planes, profile, x, header_y, tesseract_stats)
+                    if new_date:
+                        current_date = new_date
+                        log("info", "📅 Neues Datum erkannt", date=current_date, item=len(items) + 1)
+
+            fields, price_region = read_card(planes, profile, x, y, tesseract_stats, skipped_fields)
+            items.append({**fields, "date": current_date})
+            # Kopie, damit das Frame freigegeben werden kann
+            price_regions.append(price_region.copy())
+            unique_cards.append(card)
+            last_global_y = card["global_y"]
+            log(
+                "info",
+                f"📝 Item {len(items)} verarbeitet",
+                frame=index,
+                y=int(card["global_y"]),
+                **items[-1],
+                type=provisional_type(fields["price"]),
+                type_provisional=True,
+            )
+
+        if truncated:
+            break
+        prev_cards, prev_frame_h = cards, frame_h
+        prev_planes, prev_offset = planes, frame_offset
+        tail_height = min(TEMPLATE_HEIGHT, frame_h)
+        prev_tail = {"rows": planes["gray"][-tail_height:].copy(), "offset": frame_h - tail_height}
+
+    classify_item_types(items, price_regions)
+    save_widened_profile(profile, layout_cache_path)
+
+    if tesseract_stats["timeouts"]:
+        record_degradation("tesseract_timeouts", count=tesseract_stats["timeouts"], calls=tesseract_stats["calls"])
+
+    log(
+        "summary",
+        "🃏 Karten-Modus",
+        frames=len(frame_paths),
+        cards_detected=detected,
+        unique_cards=len(unique_cards),
+        duplicates_merged=merged,
+        unmatched_frames=unmatched_frames,
+    )
+    log(
+        "info",
+        "✅ OCR Pipeline abgeschlossen",
+        total_items=len(items),
+        tesseract_calls=tesseract_stats["calls"],
+        tesseract_s=round(tesseract_stats["seconds"], 2),
+        skipped_fields=sorted(skipped_fields),
+        result_image=False,
+    )
+    return items
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime, UTC
+
+
+# === LOGGING HELPER ===
+STEP_NAME = "checkpoint"
+
+
+def log(level: str, message: str, step: str | None = STEP_NAME, **data):
+    """Strukturiertes Logging für SSE Stream."""
+    payload = {
+        "level": level,
+        "message": message,
+        "timestamp": datetime.now(UTC).isoformat().replace("+00:00", "Z"),
+    }
+    if step:
+        payload["step"] = step
+    if data:
+        payload["data"] = data
+    print("LOG:", json.dumps(payload, ensure_ascii=False))
+    sys.stdout.flush()
+
+
+# === KONFIGURATION ===
+script_path = os.path.dirname(os.path.abspath(__file__))
+CHECKPOINT_DIR = os.path.join(script_path, "checkpoints")
+CHUNK_SIZE = 1024 * 1024
+
+
+def list_files(directory, suffix=".png"):
+    """Sortierte Dateien eines Verzeichnisses (leer, falls es nicht existiert)."""
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, f) for f in sorted(os.listdir(directory)) if f.endswith(suffix)]
+
+
+def hash_files(paths):
+    """Gemeinsamer SHA-256 über Dateinamen und Inhalte; None wenn eine Datei fehlt."""
+    digest = hashlib.sha256()
+    for path in paths:
+        if not os.path.isfile(path):
+            return None
+        digest.update(os.path.basename(path).encode("utf-8"))
+        with open(path, "rb") as handle:
+            for chunk in iter(lambda: handle.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _manifest_path(stage, checkpoint_dir):
+    return os.path.join(checkpoint_dir, f"{stage}.json")
+
+
+def write_checkpoint(stage, inputs, outputs, started_at, checkpoint_dir=CHECKPOINT_DIR, **meta):
+    """Schreibt das Manifest einer abgeschlossenen Stage (Input-Hash, Outputs, Dauer)."""
+    manifest = {
+        "stage": stage,
+        "inputs_hash": hash_files(inputs),
+        "outputs": [os.path.relpath(path, script_path) for path in outputs],
+        "outputs_hash": hash_files(outputs),
+        "duration_s": round(time.perf_counter() - started_at, 3),
+        "completed_at": datetime.now(UTC).isoformat().replace("+00:00", "Z"),
+        "meta": meta,
+    }
+    try:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        tmp_path = _manifest_path(stage, checkpoint_dir) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(manifest, handle, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, _manifest_path(stage, checkpoint_dir))
+        log("info", "🏁 Checkpoint geschrieben", stage=stage, outputs=len(outputs), duration_s=manifest["duration_s"])
+    except Exception as exc:
+        log("warning", "⚠️ Checkpoint konnte nicht geschrieben werden", stage=stage, error=str(exc))
+    return manifest
+
+
+def load_valid_checkpoint(stage, inputs, checkpoint_dir=CHECKPOINT_DIR):
+    """
+    Liefert das Manifest, wenn die Stage übersprungen werden kann: Inputs sind
+    unverändert und alle Outputs existieren noch mit identischem Inhalt.
+    """
+    try:
+        with open(_manifest_path(stage, checkpoint_dir), "r", encoding="utf-8") as handle:
+            manifest = json.load(handle)
+    except FileNotFoundError:
+        return None
+    except Exception as exc:
+        log("warning", "⚠️ Checkpoint unlesbar", stage=stage, error=str(exc))
+        return None
+
+    outputs = [os.path.join(script_path, path) for path in manifest.get("outputs", [])]
+    if manifest.get("inputs_hash") != hash_files(inputs):
+        log("info", "♻️ Checkpoint veraltet: Inputs geändert", stage=stage)
+        return None
+    if manifest.get("outputs_hash") != hash_files(outputs):
+        log("info", "♻️ Checkpoint veraltet: Outputs fehlen oder geändert", stage=stage)
+        return None
+    return manifest
+
@@ -0,0 +1,99 @@
+import json
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, UTC
+
+
+# === LOGGING HELPER ===
+# Kein eigener Step: Meldungen laufen unter der betroffenen Stage (capture/stitch/ocr)
+STEP_NAME = None
+
+
+def log(level: str, message: str, step: str | None = STEP_NAME, **data):
+    """Strukturiertes Logging für SSE Stream."""
+    payload = {
+        "level": level,
+        "message": message,
+        "timestamp": datetime.now(UTC).isoformat().replace("+00:00", "Z"),
+    }
+    if step:
+        payload["step"] = step
+    if data:
+        payload["data"] = data
+    print("LOG:", json.dumps(payload, ensure_ascii=False))
+    sys.stdout.flush()
+
+
+# === KONFIGURATION ===
+# Opt-in: ohne --deadline-s / --stage-budget läuft die Pipeline unbegrenzt wie bisher,
+# damit lange Listen nicht stillschweigend Felder, Items oder Frames verlieren
+DEFAULT_DEADLINE_S = None  # Obergrenze für einen kompletten Lauf
+DEFAULT_STAGE_BUDGETS = {}  # z.B. {"capture": 90, "stitch": 30, "ocr": 150}
+TESSERACT_CALL_TIMEOUT = 5  # Sekunden pro tesseract-Aufruf
+MIN_CALL_TIMEOUT = 1  # pytesseract: 0 hieße "kein Timeout"
+
+# Prozessweiter Zustand: Gesamt-Deadline, Budgets, aktive Stage und Degradierungen
+_state = {"deadline": None, "budgets": {}, "stage": None, "stage_deadline": None, "degradations": []}
+
+
+def set_deadline(total_s=DEFAULT_DEADLINE_S, stage_budgets=None):
+    """Startet die Uhr: total_s für den ganzen Lauf (None = unbegrenzt), Budgets pro Stage in Sekunden."""
+    _state["deadline"] = time.monotonic() + total_s if total_s else None
+    _state["budgets"] = dict(DEFAULT_STAGE_BUDGETS if stage_budgets is None else stage_budgets)
+    _state["stage"] = None
+    _state["stage_deadline"] = None
+    _state["degradations"] = []
+
+
+@contextmanager
+def stage_budget(name):
+    """Aktiviert das Budget einer Stage; es endet spätestens mit der Gesamt-Deadline."""
+    budget = _state["budgets"].get(name)
+    limits = [limit for limit in (_state["deadline"], time.monotonic() + budget if budget else None) if limit]
+    previous = _state["stage"], _state["stage_deadline"]
+    _state["stage"], _state["stage_deadline"] = name, min(limits) if limits else None
+    try:
+        yield
+    finally:
+        _state["stage"], _state["stage_deadline"] = previous
+
+
+def remaining():
+    """Verbleibende Sekunden der aktiven Stage (bzw. des Laufs) oder None, wenn unbegrenzt."""
+    limit = _state["stage_deadline"] if _state["stage"] else _state["deadline"]
+    return None if limit is None else max(0.0, limit - time.monotonic())
+
+
+def expired():
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def call_timeout(default=TESSERACT_CALL_TIMEOUT):
+    """Timeout für einen einzelnen externen Aufruf: nie länger als das Restbudget."""
+    left = remaining()
+    if left is None:
+        return default
+    return max(MIN_CALL_TIMEOUT, min(default, int(left)))
+
+
+def record_degradation(kind, **detail):
+    """Merkt sich eine Qualitätsreduktion der aktiven Stage fürs Summary."""
+    entry = {"stage": _state["stage"], "kind": kind, **detail}
+    _state["degradations"].append(entry)
+    log("warning", "⏱️ Zeitbudget knapp → Degradierung", step=_state["stage"], **entry)
+
+
+def stage_degraded(name):
+    return any(entry["stage"] == name for entry in _state["degradations"])
+
+
+def deadline_summary():
+    """Budgets und angewendete Degradierungen – für das Summary-Event."""
+    left = None if _state["deadline"] is None else round(max(0.0, _state["deadline"] - time.monotonic()), 1)
+    return {
+        "stage_budgets_s": dict(_state["budgets"]),
+        "remaining_s": left,
+        "degradations": list(_state["degradations"]),
+    }
@@ -0,0 +1,257 @@
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, UTC
+
+import numpy as np
+
+
+# === LOGGING HELPER ===
+STEP_NAME = "ocr"
+
+
+def log(level: str, message: str, step: str | None = STEP_NAME, **data):
+    """Strukturiertes Logging für SSE Stream."""
+    payload = {
+        "level": level,
+        "message": message,
+        "timestamp": datetime.now(UTC).isoformat().replace("+00:00", "Z"),
+    }
+    if step:
+        payload["step"] = step
+    if data:
+        payload["data"] = data
+    print("LOG:", json.dumps(payload, ensure_ascii=False))
+    sys.stdout.flush()
+
+
+# === KONFIGURATION ===
+script_path = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.abspath(os.path.join(script_path, "..", "..", "data"))
+LAYOUT_CACHE_PATH = os.path.join(data_dir, "layout-profiles.json")
+
+# Anzahl Karten, auf denen die Feld-Ausdehnungen einmalig vermessen werden
+CALIBRATION_CARDS = 8
+# Zuschlag auf die größte gemessene Ausdehnung (Faktor, Pixel); stößt ein Feld
+# später an diese Grenze, wird es bis zur Kartenkante nachgemessen und erweitert
+EXTENT_MARGIN = 1.5
+# Abweichung der Kartenbreite, ab der ein gecachtes Profil neu kalibriert wird
+MAX_WIDTH_DRIFT = 0.02
+# Wird erhöht, wenn sich der Aufbau des Profils ändert → alte Cache-Einträge verfallen
+PROFILE_VERSION = 5
+
+# Kartenbreiten, für die DEFAULT_ANCHORS unverändert gelten (Skalierung exakt 1.0).
+# Die Breite bei Standard-Fenstergröße ist nicht vermessen, daher ein Bereich statt
+# eines Werts: untere Grenze = Preis-Anker (733 px) plus Rand, obere großzügig.
+# Außerhalb wird relativ zur nächsten Grenze skaliert – stetig, unabhängig davon,
+# welches Fenster zuerst kalibriert wurde.
+BASELINE_BOX_WIDTHS = (740, 880)
+
+# Feld-Anker bei Standard-Fenstergröße, relativ zur linken oberen Ecke der Karte.
+# (dx, dy, height, buffer, mode, source) – source: "thresh" oder "gray"
+DEFAULT_ANCHORS = {
+    "date": (20, -33, 26, 12, "starting_left", "gray"),
+    "tag": (102, 56, 38, 3, "starting_left", "thresh"),
+    "price_probe": (733, 35, 40, 3, "starting_right", "thresh"),
+    "price": (725, 35, 40, 12, "starting_right", "thresh"),
+    "name": (98, 20, 35, 12, "starting_left", "thresh"),
+    "category": (98, 59, 35, 12, "starting_left", "thresh"),
+}
+# Erstes Datum: absolute Position im gestitchten Bild
+DEFAULT_FIRST_DATE = (1110, 9, 26, 12)
+# Pixel-Schwellen und Abstände, die mit der Skalierung mitwachsen.
+# Schwellen zählen dunkle Pixel (thresh == 0), nicht Kanäle eines 3-Kanal-Bildes.
+DEFAULT_METRICS = {
+    "tag_dark_min": 3333,  # skaliert quadratisch (Fläche)
+    "price_dark_min": 333,  # skaliert quadratisch (Fläche)
+    "tag_name_shift": 5,
+    "field_gap": 3,
+}
+
+
+def _integral_column_hits(integral, y, height, x0, x1):
+    """Dunkle Pixel pro Spalte x0..x1-1 in den Zeilen y..y+height-1 aus dem Integralbild."""
+    y0 = max(0, y)
+    y1 = max(y0, min(y + height, integral.shape[0] - 1))
+    rows = integral[y1, x0:x1 + 1] - integral[y0, x0:x1 + 1]
+    return np.diff(rows)
+
+
+def field_extent(source, x, y, height, max_width, buffer, mode, integral=None):
+    """
+    Misst die Länge eines Textfeldes ab (x, y): gezählt wird bis inklusive der
+    ersten `buffer` leeren Spalten in Folge. Vektorisiert und auf max_width begrenzt.
+    mode: 'starting_left' scannt nach rechts (dunkel = < 100),
+          'starting_right' scannt nach links (dunkel = == 0).
+    integral: Integralbild der dunklen Pixel eines Binärbildes – dann werden die
+    Spaltensummen ohne Zugriff auf die Pixel berechnet.
+    """
+    if mode == "starting_left":
+        x0, x1 = max(x, 0), min(x + max_width, source.shape[1])
+        if x1 <= x0:
+            return 0
+        if integral is not None:
+            hits = _integral_column_hits(integral, y, height, x0, x1)
+        else:
+            hits = np.count_nonzero(source[y:y + height, x0:x1] < 100, axis=0)
+    else:
+        x0, x1 = max(x - max_width + 1, 0), min(x + 1, source.shape[1])
+        if x1 <= x0:
+            return 0
+        if integral is not None:
+            hits = _integral_column_hits(integral, y, height, x0, x1)[::-1]
+        else:
+            hits = np.count_nonzero(source[y:y + height, x0:x1] == 0, axis=0)[::-1]
+
+    clean = (hits == 0).astype(np.int32)
+    if clean.size < buffer:
+        return int(clean.size)
+    runs = np.convolve(clean, np.ones(buffer, dtype=np.int32), mode="valid")
+    full = np.flatnonzero(runs == buffer)
+    if full.size:
+        return int(full[0]) + buffer
+    return int(clean.size)
+
+
+def window_key(window_size, image_width):
+    """Cache-Schlüssel: Fenstergröße aus der Capture-Phase, sonst Bildbreite."""
+    if window_size:
+        return f"{int(window_size[0])}x{int(window_size[1])}@{image_width}px"
+    return f"{image_width}px"
+
+
+def _scale_anchor(anchor, scale):
+    dx, dy, height, buffer, mode, source = anchor
+    return (round(dx * scale), round(dy * scale), max(1, round(height * scale)), max(1, round(buffer * scale)), mode, source)
+
+
+def layout_scale(box_width):
+    """Skalierung der Standard-Anker: 1.0 im Baseline-Bereich, sonst relativ zur nächsten Grenze."""
+    low, high = BASELINE_BOX_WIDTHS
+    return round(box_width / min(max(box_width, low), high), 4)
+
+
+def _load_cache(cache_path):
+    try:
+        with open(cache_path, "r", encoding="utf-8") as handle:
+            cache = json.load(handle)
+        if isinstance(cache, dict):
+            return cache
+    except FileNotFoundError:
+        pass
+    except Exception as exc:
+        log("warning", "⚠️ Layout-Cache unlesbar, wird neu angelegt", path=cache_path, error=str(exc))
+    return {}
+
+
+def _save_cache(cache, cache_path):
+    try:
+        cache_dir = os.path.dirname(cache_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        # Eigene Temp-Datei pro Schreiber: parallele Worker überschreiben sich nicht halb
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=cache_dir, prefix=".layout-", suffix=".tmp", delete=False
+        ) as handle:
+            json.dump(cache, handle, ensure_ascii=False, indent=2)
+        os.replace(handle.name, cache_path)
+    except Exception as exc:
+        log("warning", "⚠️ Layout-Profil konnte nicht gespeichert werden", path=cache_path, error=str(exc))
+
+
+def calibrate_layout_profile(boxes, planes, box_width, scale):
+    """
+    Leitet ein Layout-Profil aus einer Aufnahme ab: Anker werden skaliert, die
+    Ausdehnung jedes Feldes wird auf den ersten Karten (unbegrenzt) vermessen.
+    """
+    anchors = {name: _scale_anchor(anchor, scale) for name, anchor in DEFAULT_ANCHORS.items()}
+    fx, fy, fh, fb = DEFAULT_FIRST_DATE
+    first_date = (round(fx * scale), round(fy * scale), max(1, round(fh * scale)), max(1, round(fb * scale)))
+
+    measured = {name: 0 for name in anchors}
+    for box in boxes[:CALIBRATION_CARDS]:
+        for name, (dx, dy, height, buffer, mode, source) in anchors.items():
+            plane = planes[source]
+            unbounded = plane.shape[1]
+            length = field_extent(plane, box["x"] + dx, box["y"] + dy, height, unbounded, buffer, mode)
+            measured[name] = max(measured[name], length)
+
+    extents, limits = {}, {}
+    for name, (dx, _, _, buffer, mode, _) in anchors.items():
+        limits[name] = dx + 1 if mode == "starting_right" else max(buffer, box_width - dx)
+        extent = int(measured[name] * EXTENT_MARGIN) + buffer
+        extents[name] = max(buffer, min(extent, limits[name]))
+
+    metrics = {
+        "tag_dark_min": round(DEFAULT_METRICS["tag_dark_min"] * scale * scale),
+        "price_dark_min": round(DEFAULT_METRICS["price_dark_min"] * scale * scale),
+        "tag_name_shift": round(DEFAULT_METRICS["tag_name_shift"] * scale),
+        "field_gap": max(1, round(DEFAULT_METRICS["field_gap"] * scale)),
+    }
+
+    return {
+        "box_width": box_width,
+        "scale": scale,
+        "anchors": anchors,
+        "first_date": first_date,
+        "extents": extents,
+        "limits": limits,
+        "metrics": metrics,
+        "calibrated_at": datetime.now(UTC).isoformat().replace("+00:00", "Z"),
+        "version": PROFILE_VERSION,
+    }
+
+
+def get_layout_profile(key, boxes, planes, cache_path=LAYOUT_CACHE_PATH):
+    """
+    Liefert das Layout-Profil für die aktuelle Fenstergröße aus dem Cache oder
+    kalibriert es neu. Die Skalierung liefert layout_scale.
+
+    boxes: nach y sortierte Transaktionsboxen, planes: {"thresh": ..., "gray": ...}
+    """
+    if not boxes:
+        return calibrate_layout_profile([], planes, 0, 1.0)
+
+    box_width = int(np.median([box["w"] for box in boxes]))
+    cache = _load_cache(cache_path)
+    profiles = cache.setdefault("profiles", {})
+
+    cached = profiles.get(key)
+    if (
+        cached
+        and cached.get("version") == PROFILE_VERSION
+        and abs(cached.get("box_width", 0) - box_width) <= box_width * MAX_WIDTH_DRIFT
+    ):
+        cached["anchors"] = {name: tuple(anchor) for name, anchor in cached["anchors"].items()}
+        cached["first_date"] = tuple(cached["first_date"])
+        log("info", "📐 Layout-Profil aus Cache geladen", key=key, scale=cached["scale"])
+        return cached
+
+    scale = layout_scale(box_width)
+    profile = calibrate_layout_profile(boxes, planes, box_width, scale)
+    profile["key"] = key
+
+    profiles[key] = profile
+    _save_cache(cache, cache_path)
+    log("info", "📐 Layout-Profil kalibriert", key=key, scale=scale, extents=profile["extents"])
+    return profile
+
+
+def widen_extent(profile, field, length):
+    """Ein Feld war länger als die gecachte Ausdehnung: Grenze für spätere Karten anheben."""
+    buffer = profile["anchors"][field][3]
+    extent = min(int(length * EXTENT_MARGIN) + buffer, profile["limits"][field])
+    if extent <= profile["extents"][field]:
+        return
+    log("info", "📐 Feld-Ausdehnung erweitert", field=field, old=profile["extents"][field], new=extent)
+    profile["extents"][field] = extent
+    profile["widened"] = True
+
+
+def save_widened_profile(profile, cache_path=LAYOUT_CACHE_PATH):
+    """Schreibt ein während des Laufs erweitertes Profil zurück in den Cache."""
+    if not profile or not profile.pop("widened", False) or "key" not in profile:
+        return
+    cache = _load_cache(cache_path)
+    cache.setdefault("profiles", {})[profile["key"]] = profile
+    _save_cache(cache, cache_path)
@@ -1,12 +1,24 @@
+import argparse
+import fcntl
 import json
 import os
 import shutil
+import signal
 import sys
+import time
 from datetime import datetime, UTC
 
 from capture_scroll_hq import capture_and_crop_screenshots
+from scroll_overlap import CROP_BOTTOM_OFFSET, replay_frame_source
 from stitch_overlap import stitch_scroll_sequence
 from ocr_extract import ocr_extract
+from card_pipeline import ocr_cards
+from checkpoint import list_files, load_valid_checkpoint, write_checkpoint
+from session_archive import archive_session, save_session_result
+from results_store import append_run, load_run
+from memory_monitor import memory_summary, set_memory_budget, track_stage
+from deadline import DEFAULT_DEADLINE_S, DEFAULT_STAGE_BUDGETS, deadline_summary, set_deadline, stage_budget, stage_degraded
+from normalize_items import normalize_items, summarize_import
 
 script_path = os.path.dirname(os.path.abspath(__file__))
 shots_path = os.path.join(script_path, "shots")
@@ -16,8 +28,21 @@ debug_stitch_path = os.path.join(script_path, "debug", "stitch")
 debug_ocr_path = os.path.join(script_path, "debug")
 
 stitched_path = os.path.join(script_path, "stitched.png")
-data_dir = os.path.abspath(os.path.join(script_path, "..", "..", "data"))
-latest_items_path = os.path.join(data_dir, "ocr-latest.json")
+
+STAGES = ("capture", "stitch", "ocr")
+# stitch: Frames zu einem langen Bild zusammensetzen, dann OCR
+# cards:  Karten direkt pro Frame erkennen und zusammenführen, ohne Stitching
+MODES = ("stitch", "cards")
+
+# Verhindert parallele Läufe (z.B. CLI neben dem Web-Scheduler), die sich
+# Fenster, shots/ und Checkpoints teilen würden
+LOCK_PATH = os.path.join(script_path, "pipeline.lock")
+EXIT_BUSY = 75
+EXIT_CANCELLED = 130
+
+
+class PipelineCancelled(BaseException):
+    """SIGTERM vom Scheduler: laufende Stage abbrechen, ohne Checkpoint zu schreiben."""
 
 
 def log(level: str, message: str, step: str | None = None, **data):
@@ -34,80 +59,287 @@ def log(level: str, message: str, step: str | None = None, **data):
     sys.stdout.flush()
 
 
-def save_latest_items(items):
+def save_ocr_run(items):
+    """Hängt die OCR Items als neuen Run an den Ergebnis-Store an; gibt die Run-ID zurück."""
     try:
-        os.makedirs(data_dir, exist_ok=True)
-        with open(latest_items_path, "w", encoding="utf-8") as handle:
-            json.dump(items, handle, ensure_ascii=False, indent=2)
-        log("info", "💾 OCR Items gespeichert", step="ocr", count=len(items))
+        run_id = append_run(items)
+        log("info", "💾 OCR Items gespeichert", step="ocr", count=len(items), run_id=run_id)
+        return run_id
     except Exception as exc:
         log("error", "❌ Konnte OCR Items nicht speichern", step="ocr", error=str(exc))
+        return None
 
 
-def run_pipeline():
+def _raise_cancelled(signum, _frame):
+    raise PipelineCancelled(signal.Signals(signum).name)
+
+
+def acquire_pipeline_lock(lock_path=LOCK_PATH):
+    """Exklusiver Lock für die Dauer des Prozesses; None, wenn bereits ein Lauf aktiv ist."""
+    handle = open(lock_path, "a+")
     try:
-        log("info", "🚀 Pipeline gestartet")
-
-        # 1. Alte Ordner löschen, wenn sie existieren
-        try:
-            for directory, description in [(shots_path, "Screenshots"), (cropped_path, "beschnittene Bilder")]:
-                if os.path.exists(directory):
-                    shutil.rmtree(directory)
-                    log("info", f"🗑️ {description} gelöscht", path=directory)
-        except Exception as e:
-            log("error", "❌ Fehler beim Löschen alter Ordner", error=str(e))
-            raise
-
-        # 2. Neue Ordner erstellen
-        try:
-            os.makedirs(shots_path, exist_ok=True)
-            os.makedirs(cropped_path, exist_ok=True)
-            log("info", "📁 Ordner erstellt")
-        except Exception as e:
-            log("error", "❌ Fehler beim Erstellen der Ordner", error=str(e))
-            raise
-
-        # 3. Screenshots aufnehmen und croppen (speichert in shots_path und cropped_path)
-        try:
-            log("info", "📸 Starte Screenshot-Phase", step="capture")
-            capture_and_crop_screenshots(shots_path, cropped_path)
-        except Exception as e:
-            log("error", "❌ Screenshot-Phase fehlgeschlagen", step="capture", error=str(e))
-            raise
-
-        # 4. Gecroppte Bilder zu einem langen Bild zusammenfügen (speichert in stitched_path)
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        handle.close()
+        return None
+    handle.seek(0)
+    handle.truncate()
+    handle.write(str(os.getpid()))
+    handle.flush()
+    return handle
+
+
+def _reusable_checkpoint(stage, inputs, reusing, from_stage):
+    """Gültiges Manifest einer Stage, falls sie übersprungen werden darf."""
+    if not reusing:
+        return None
+    manifest = load_valid_checkpoint(stage, inputs)
+    if manifest and manifest["meta"].get("degraded"):
+        # Unter Zeitdruck gekürzte Ergebnisse nicht als vollständig wiederverwenden
+        log("info", "↩️ Checkpoint verworfen (Stage lief degradiert)", step=stage)
+        manifest = None
+    if manifest is None and from_stage and STAGES.index(stage) < STAGES.index(from_stage):
+        raise RuntimeError(f"Kein gültiger Checkpoint für Stage '{stage}', Start ab '{from_stage}' nicht möglich")
+    return manifest
+
+
+def run_pipeline(
+    resume=False,
+    from_stage=None,
+    replay_path=None,
+    replay_frame_height=1400,
+    memory_budget_mb=None,
+    trace_memory=False,
+    artifacts=False,
+    deadline_s=DEFAULT_DEADLINE_S,
+    stage_budgets=None,
+    mode="stitch",
+):
+    """
+    Führt Capture → Stitch → OCR aus. Jede Stage schreibt ein Checkpoint-Manifest.
+    resume: Stages mit gültigem Checkpoint überspringen, ab der ersten ungültigen neu rechnen.
+    from_stage: alle Stages davor aus Checkpoints übernehmen, ab dieser Stage neu rechnen.
+    replay_path: Capture aus einem langen Bild simulieren statt live aufzunehmen.
+    memory_budget_mb: wird es knapp, wechseln die Stages in sparsamere Strategien.
+    trace_memory: tracemalloc-Peaks pro Stage auch ohne Budget messen (langsamer).
+    artifacts: gecroppte Einzelbilder zusätzlich nach shots_cropped/ schreiben.
+    deadline_s / stage_budgets: Zeitobergrenze für den Lauf und pro Stage (Sekunden);
+        wird es knapp, kürzen die Stages ihre Arbeit und melden das im Summary.
+    mode: "stitch" (Standard) oder "cards" – im Karten-Modus entfällt die Stitch-Stage.
+    """
+    try:
+        log(
+            "info",
+            "🚀 Pipeline gestartet",
+            resume=resume,
+            from_stage=from_stage,
+            memory_budget_mb=memory_budget_mb,
+            deadline_s=deadline_s,
+            mode=mode,
+        )
+        set_memory_budget(memory_budget_mb, trace_allocations=trace_memory)
+        set_deadline(deadline_s, stage_budgets)
+        # Solange reusing gilt, dürfen Stages aus Checkpoints übernommen werden
+        reusing = resume or from_stage not in (None, "capture")
+        timings = {}
+
+        # Capture: Screenshots aufnehmen (speichert in shots_path, mit artifacts auch in cropped_path)
+        manifest = _reusable_checkpoint("capture", [], reusing, from_stage)
+        if manifest:
+            window_w, window_h = manifest["meta"]["window"]
+            session_id = manifest["meta"].get("session_id")
+            timings["capture"] = "checkpoint"
+            log("info", "⏭️ Screenshot-Phase übersprungen (Checkpoint gültig)", step="capture", completed_at=manifest["completed_at"])
+        else:
+            reusing = False
+            started_at = time.perf_counter()
+
+            # 1. Alte Ordner löschen, wenn sie existieren
+            try:
+                for directory, description in [(shots_path, "Screenshots"), (cropped_path, "beschnittene Bilder")]:
+                    if os.path.exists(directory):
+                        shutil.rmtree(directory)
+                        log("info", f"🗑️ {description} gelöscht", path=directory)
+            except Exception as e:
+                log("error", "❌ Fehler beim Löschen alter Ordner", error=str(e))
+                raise
+
+            # 2. Neue Ordner erstellen
+            try:
+                os.makedirs(shots_path, exist_ok=True)
+                if artifacts:
+                    os.makedirs(cropped_path, exist_ok=True)
+                log("info", "📁 Ordner erstellt")
+            except Exception as e:
+                log("error", "❌ Fehler beim Erstellen der Ordner", error=str(e))
+                raise
+
+            # 3. Screenshots aufnehmen
+            try:
+                log("info", "📸 Starte Screenshot-Phase", step="capture")
+                frame_source = replay_frame_source(replay_path, replay_frame_height) if replay_path else None
+                with track_stage("capture"), stage_budget("capture"):
+                    _, _, window_w, window_h = capture_and_crop_screenshots(
+                        shots_path, cropped_path if artifacts else None, frame_source=frame_source
+                    )
+            except Exception as e:
+                log("error", "❌ Screenshot-Phase fehlgeschlagen", step="capture", error=str(e))
+                raise
+            # Session archivieren, damit spätere Reprocessing-Läufe ohne neue Aufnahme auskommen
+            session_id = None
+            try:
+                session_id = archive_session(shots_path, window=(window_w, window_h))
+            except Exception as e:
+                log("warning", "⚠️ Session konnte nicht archiviert werden", step="capture", error=str(e))
+
+            outputs = list_files(shots_path) + list_files(cropped_path)
+            timings["capture"] = write_checkpoint(
+                "capture",
+                [],
+                outputs,
+                started_at,
+                window=[window_w, window_h],
+                session_id=session_id,
+                degraded=stage_degraded("capture"),
+            )["duration_s"]
+
+        # 4. Screenshots zu einem langen Bild zusammenfügen, unten croppen beim Laden (speichert in stitched_path)
         #   Die Debug-Bilder werden im debug_stitch_path gespeichert 
-        try:
-            log("info", "🧵 Starte Stitch-Phase", step="stitch")
-            stitch_scroll_sequence(cropped_path, stitched_path, debug_stitch_path)
-        except Exception as e:
-            log("error", "❌ Stitch-Phase fehlgeschlagen", step="stitch", error=str(e))
-            raise
+        stitch_inputs = list_files(shots_path)
+        if from_stage == "stitch":
+            reusing = False
+        manifest = _reusable_checkpoint("stitch", stitch_inputs, reusing, from_stage) if mode == "stitch" else None
+        if mode == "cards":
+            timings["stitch"] = "entfällt (cards)"
+            # Ein stitched.png aus einem früheren Lauf passt nicht zu diesen Frames
+            if os.path.exists(stitched_path):
+                os.remove(stitched_path)
+            log("info", "⏭️ Stitch-Phase entfällt im Karten-Modus", step="stitch")
+        elif manifest:
+            timings["stitch"] = "checkpoint"
+            log("info", "⏭️ Stitch-Phase übersprungen (Checkpoint gültig)", step="stitch", completed_at=manifest["completed_at"])
+        else:
+            reusing = False
+            started_at = time.perf_counter()
+            try:
+                log("info", "🧵 Starte Stitch-Phase", step="stitch")
+                with track_stage("stitch"), stage_budget("stitch"):
+                    stitch_scroll_sequence(shots_path, stitched_path, debug_stitch_path, crop_bottom=CROP_BOTTOM_OFFSET)
+            except Exception as e:
+                log("error", "❌ Stitch-Phase fehlgeschlagen", step="stitch", error=str(e))
+                raise
+            timings["stitch"] = write_checkpoint(
+                "stitch", stitch_inputs, [stitched_path], started_at, degraded=stage_degraded("stitch")
+            )["duration_s"]
 
         # 5. OCR auf dem langen Bild ausführen und Ergebnis zurückgeben
         #   Die Debug-Bilder werden im debug_ocr_path gespeichert
-        try:
-            log("info", "🧠 Starte OCR-Phase", step="ocr")
-            ocr_result = ocr_extract(stitched_path, debug_ocr_path)
-            save_latest_items(ocr_result)
-        except Exception as e:
-            log("error", "❌ OCR-Phase fehlgeschlagen", step="ocr", error=str(e))
-            raise
-
-        log("info", "✅ Pipeline abgeschlossen")
+        if from_stage == "ocr":
+            reusing = False
+        # Karten-Modus liest direkt die Frames statt des gestitchten Bildes
+        ocr_inputs = stitch_inputs if mode == "cards" else [stitched_path]
+        manifest = _reusable_checkpoint("ocr", ocr_inputs, reusing, from_stage)
+        if manifest and manifest["meta"].get("mode", "stitch") != mode:
+            manifest = None
+        ocr_result = load_run(manifest["meta"].get("run_id")) if manifest else None
+        if ocr_result is not None:
+            timings["ocr"] = "checkpoint"
+            log("info", "⏭️ OCR-Phase übersprungen (Checkpoint gültig)", step="ocr", count=len(ocr_result))
+        else:
+            started_at = time.perf_counter()
+            try:
+                log("info", "🧠 Starte OCR-Phase", step="ocr")
+                with track_stage("ocr"), stage_budget("ocr"):
+                    if mode == "cards":
+                        ocr_result = ocr_cards(
+                            shots_path, debug_ocr_path, window_size=(window_w, window_h), crop_bottom=CROP_BOTTOM_OFFSET
+                        )
+                    else:
+                        ocr_result = ocr_extract(stitched_path, debug_ocr_path, window_size=(window_w, window_h))
+                # Preise/Daten typisieren und Fingerprints berechnen; die Import-Seite liest diese Felder aus dem Store
+                ocr_result = normalize_items(ocr_result, run_time=datetime.now())
+                run_id = save_ocr_run(ocr_result)
+                try:
+                    summarize_import(ocr_result)
+                except Exception as e:
+                    # Nur Diagnose: darf die OCR-Phase nicht scheitern lassen
+                    log("warning", "⚠️ Import-Vorschau fehlgeschlagen", step="ocr", error=str(e))
+                if session_id:
+                    save_session_result(session_id, ocr_result, "capture")
+            except Exception as e:
+                log("error", "❌ OCR-Phase fehlgeschlagen", step="ocr", error=str(e))
+                raise
+            timings["ocr"] = write_checkpoint(
+                "ocr", ocr_inputs, [], started_at, run_id=run_id, mode=mode, degraded=stage_degraded("ocr")
+            )["duration_s"]
+
+        log("summary", "⏱️ Stage-Laufzeiten (s)", **timings)
+        log("summary", "🧠 Speicher pro Stage", **memory_summary())
+        log("summary", "⏱️ Zeitbudget & Degradierungen", **deadline_summary())
+        # "✅ Pipeline abgeschlossen" meldet der Scheduler (pipelineJobs.ts) beim Prozessende
         return ocr_result
         
     except Exception as e:
-        log("error", "❌ Pipeline mit Fehler beendet", error=str(e))
+        log("error", "❌ Pipeline-Fehler", error=str(e))
         raise
 
 
+def _stage_budget_arg(value):
+    """'ocr=120' → ('ocr', 120.0)"""
+    stage, _, seconds = value.partition("=")
+    if stage not in STAGES:
+        raise argparse.ArgumentTypeError(f"unbekannte Stage: {stage}")
+    try:
+        return stage, float(seconds)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ungültige Sekundenangabe: {value}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Stonks OCR-Pipeline: Capture → Stitch → OCR")
+    parser.add_argument("--resume", action="store_true", help="Stages mit gültigem Checkpoint überspringen")
+    parser.add_argument("--from-stage", choices=STAGES, help="Ab dieser Stage neu rechnen, davor Checkpoints nutzen")
+    parser.add_argument("--replay", metavar="IMAGE", help="Capture aus einem langen Bild simulieren (ohne Bildschirm)")
+    parser.add_argument("--replay-frame-height", type=int, default=1400, help="Frame-Höhe in Pixeln für --replay")
+    parser.add_argument("--artifacts", action="store_true", help="Gecroppte Einzelbilder nach shots_cropped/ schreiben")
+    parser.add_argument("--memory-budget-mb", type=float, default=None, help="Speicherbudget; bei Knappheit ohne Debug-Kopien weiterarbeiten")
+    parser.add_argument("--trace-memory", action="store_true", help="tracemalloc-Peaks pro Stage messen (auch ohne Budget)")
+    parser.add_argument("--mode", choices=MODES, default="stitch", help="cards: ohne Stitching, Karten pro Frame erkennen")
+    parser.add_argument("--deadline-s", type=float, default=DEFAULT_DEADLINE_S, help="Zeitobergrenze für den ganzen Lauf (Standard: unbegrenzt)")
+    parser.add_argument(
+        "--stage-budget",
+        type=_stage_budget_arg,
+        action="append",
+        default=[],
+        metavar="STAGE=SEKUNDEN",
+        help="Zeitbudget einer Stage setzen, z.B. ocr=120 (mehrfach möglich, Standard: unbegrenzt)",
+    )
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    pipeline_lock = acquire_pipeline_lock()
+    if pipeline_lock is None:
+        log("error", "❌ Pipeline läuft bereits in einem anderen Prozess", lock=LOCK_PATH)
+        sys.exit(EXIT_BUSY)
+    signal.signal(signal.SIGTERM, _raise_cancelled)
     try:
-        run_pipeline()
+        run_pipeline(
+            resume=args.resume,
+            from_stage=args.from_stage,
+            replay_path=args.replay,
+            replay_frame_height=args.replay_frame_height,
+            memory_budget_mb=args.memory_budget_mb,
+            trace_memory=args.trace_memory,
+            artifacts=args.artifacts,
+            deadline_s=args.deadline_s,
+            stage_budgets={**DEFAULT_STAGE_BUDGETS, **dict(args.stage_budget)},
+            mode=args.mode,
+        )
+    except PipelineCancelled as e:
+        log("warning", "🛑 Abbruch-Signal erhalten, Pipeline gestoppt", signal=str(e))
+        sys.exit(EXIT_CANCELLED)
     except Exception as e:
         log("error", "❌ Kritischer Fehler", error=str(e))
         sys.exit(1)
-
-
-        
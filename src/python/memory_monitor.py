@@ -0,0 +1,181 @@
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, UTC
+
+try:
+    import psutil
+except ImportError:  # optional: ohne psutil wird /proc (Linux) bzw. ru_maxrss (macOS) genutzt
+    psutil = None
+
+
+# === LOGGING HELPER ===
+STEP_NAME = "memory"
+
+
+def log(level: str, message: str, step: str | None = STEP_NAME, **data):
+    """Strukturiertes Logging für SSE Stream."""
+    payload = {
+        "level": level,
+        "message": message,
+        "timestamp": datetime.now(UTC).isoformat().replace("+00:00", "Z"),
+    }
+    if step:
+        payload["step"] = step
+    if data:
+        payload["data"] = data
+    print("LOG:", json.dumps(payload, ensure_ascii=False))
+    sys.stdout.flush()
+
+
+# === KONFIGURATION ===
+SAMPLE_INTERVAL = 0.05  # Sekunden zwischen RSS-Messungen
+LOW_MEMORY_RATIO = 0.8  # ab diesem Anteil des Budgets wird gespart
+MB = 1024 * 1024
+
+# Prozessweiter Zustand: Budget, Low-Memory-Modus, tracemalloc an/aus, Stage-Stack und Ergebnisse
+_state = {"budget": None, "low_memory": False, "trace": False, "stack": [], "stats": {}}
+_lock = threading.Lock()
+
+
+def _current_rss():
+    """
+    Aktueller RSS in Bytes. Ohne psutil und /proc (macOS) bleibt nur der bisherige
+    Höchststand aus getrusage – für die Budget-Prüfung die vorsichtige Schätzung.
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm", "r") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return _max_rss()
+
+
+def _max_rss():
+    """Höchster RSS des Prozesses bisher (macOS: Bytes, Linux: KiB)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def set_memory_budget(budget_mb, trace_allocations=False):
+    """
+    Setzt das Speicherbudget in MB (None = unbegrenzt) und setzt die Statistik zurück.
+    tracemalloc läuft nur mit Budget oder trace_allocations – es verlangsamt jede Allokation.
+    """
+    _state["budget"] = int(budget_mb * MB) if budget_mb else None
+    _state["trace"] = bool(trace_allocations or _state["budget"])
+    _state["low_memory"] = False
+    _state["stats"] = {}
+
+
+def _check_budget(used_bytes, stage):
+    budget = _state["budget"]
+    if budget is None or _state["low_memory"] or used_bytes is None:
+        return
+    if used_bytes > budget * LOW_MEMORY_RATIO:
+        _state["low_memory"] = True
+        log(
+            "warning",
+            "⚠️ Speicherbudget knapp → Low-Memory-Modus (Debug-Kopien werden übersprungen)",
+            stage=stage,
+            used_mb=round(used_bytes / MB, 1),
+            budget_mb=round(budget / MB, 1),
+        )
+
+
+def low_memory_mode():
+    """True, sobald das Budget einmal knapp wurde; Stages wählen dann sparsamere Strategien."""
+    if _state["stack"]:
+        _check_budget(_current_rss(), _state["stack"][-1]["name"])
+    return _state["low_memory"]
+
+
+def _sampler(stop_event):
+    while not stop_event.wait(SAMPLE_INTERVAL):
+        rss = _current_rss()
+        with _lock:
+            for frame in _state["stack"]:
+                frame["rss_peak"] = max(frame["rss_peak"], rss)
+            stage = _state["stack"][-1]["name"] if _state["stack"] else None
+        _check_budget(rss, stage)
+
+
+@contextmanager
+def track_stage(name):
+    """
+    Misst Peak-RSS und – mit Budget oder trace_allocations – die tracemalloc-
+    Hochwassermarke (inkl. numpy-Puffer) einer Stage. Verschachtelte Stages (z.B.
+    crop in capture) geben ihren Peak an die äußere weiter; die äußerste Stage
+    stoppt tracemalloc wieder.
+    """
+    owns_tracing = _state["trace"] and not tracemalloc.is_tracing()
+    if owns_tracing:
+        tracemalloc.start()
+    tracing = tracemalloc.is_tracing()
+    rss = _current_rss()
+    frame = {
+        "name": name,
+        "started_at": time.perf_counter(),
+        "rss_start": rss,
+        "rss_peak": rss,
+        "child_traced_peak": 0,
+    }
+    with _lock:
+        if _state["stack"] and tracing:
+            # Bisherigen Peak der äußeren Stage sichern, bevor reset_peak ihn löscht
+            parent = _state["stack"][-1]
+            parent["child_traced_peak"] = max(parent["child_traced_peak"], tracemalloc.get_traced_memory()[1])
+        _state["stack"].append(frame)
+    if tracing:
+        tracemalloc.reset_peak()
+
+    stop_event = threading.Event()
+    sampler = threading.Thread(target=_sampler, args=(stop_event,), daemon=True)
+    sampler.start()
+
+    try:
+        yield
+    finally:
+        stop_event.set()
+        sampler.join()
+        traced_peak = None
+        if tracing:
+            traced_peak = max(tracemalloc.get_traced_memory()[1], frame["child_traced_peak"])
+        frame["rss_peak"] = max(frame["rss_peak"], _current_rss())
+        with _lock:
+            _state["stack"].pop()
+            if _state["stack"]:
+                parent = _state["stack"][-1]
+                if traced_peak is not None:
+                    parent["child_traced_peak"] = max(parent["child_traced_peak"], traced_peak)
+                parent["rss_peak"] = max(parent["rss_peak"], frame["rss_peak"])
+        if owns_tracing:
+            tracemalloc.stop()
+        elif tracing:
+            tracemalloc.reset_peak()
+
+        stats = {
+            "peak_rss_mb": round(frame["rss_peak"] / MB, 1),
+            "process_max_rss_mb": round(_max_rss() / MB, 1),
+            "traced_peak_mb": round(traced_peak / MB, 1) if traced_peak is not None else None,
+            "duration_s": round(time.perf_counter() - frame["started_at"], 3),
+            "low_memory": _state["low_memory"],
+        }
+        _state["stats"][name] = stats
+        _check_budget(frame["rss_peak"], name)
+        log("info", "🧠 Speicher-Peak der Stage", stage=name, **stats)
+
+
+def memory_summary():
+    """Alle bisher gemessenen Stages und das Budget – für das Summary-Event."""
+    return {
+        "budget_mb": round(_state["budget"] / MB, 1) if _state["budget"] else None,
+        "low_memory": _state["low_memory"],
+        "stages": dict(_state["stats"]),
+    }
@@ -0,0 +1,116 @@
+import json
+import re
+import sys
+from datetime import date, datetime, timedelta, UTC
+
+from results_store import IMPORTED_PATH, fingerprint_items, imported_fingerprints
+
+
+# === LOGGING HELPER ===
+STEP_NAME = "ocr"
+
+
+def log(level: str, message: str, step: str | None = STEP_NAME, **data):
+    """Strukturiertes Logging für SSE Stream."""
+    payload = {
+        "level": level,
+        "message": message,
+        "timestamp": datetime.now(UTC).isoformat().replace("+00:00", "Z"),
+    }
+    if step:
+        payload["step"] = step
+    if data:
+        payload["data"] = data
+    print("LOG:", json.dumps(payload, ensure_ascii=False))
+    sys.stdout.flush()
+
+
+# === KONFIGURATION ===
+PRICE_CHARS = re.compile(r"[^\d.,]")
+DATE_PATTERN = re.compile(r"(\d{1,2})\.(\d{1,2})\.?")
+RELATIVE_DAYS = {"heute": 0, "gestern": 1}
+
+
+def parse_price(raw):
+    """
+    "-1.234,56 €" → 123456 Cent (Betrag ohne Vorzeichen) oder None, wenn unlesbar.
+    Tausenderpunkte werden entfernt, das Komma ist Dezimaltrenner.
+    """
+    cleaned = PRICE_CHARS.sub("", raw or "").replace(".", "").replace(",", ".")
+    try:
+        return round(abs(float(cleaned)) * 100)
+    except ValueError:
+        return None
+
+
+def parse_date(raw, run_day):
+    """
+    Wochentags-Datumsangabe ("30.09. Di", "Heute") → date oder None, Jahr aus dem
+    Run-Datum: liegt Tag/Monat nach dem Run-Datum, stammt das Item aus dem Vorjahr.
+    """
+    text = (raw or "").strip().casefold()
+    for label, offset in RELATIVE_DAYS.items():
+        if text.startswith(label):
+            return run_day - timedelta(days=offset)
+
+    match = DATE_PATTERN.search(text)
+    if not match:
+        return None
+    day, month = int(match.group(1)), int(match.group(2))
+    year = run_day.year - 1 if (month, day) > (run_day.month, run_day.day) else run_day.year
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def normalize_items(items, run_time=None):
+    """
+    Ergänzt OCR Items um typisierte Werte und einen stabilen Fingerprint:
+    amount (float, positiv), date_iso (YYYY-MM-DD oder None), fingerprint.
+    """
+    run_day = (run_time or datetime.now()).date()
+
+    normalized = []
+    for item in items:
+        entry = dict(item)
+        cents = parse_price(item.get("price"))
+        parsed_date = parse_date(item.get("date"), run_day)
+        entry["amount"] = round(cents / 100, 2) if cents is not None else None
+        entry["date_iso"] = parsed_date.isoformat() if parsed_date else None
+        normalized.append(entry)
+
+    typed_keys = [
+        {"date": entry["date_iso"], "name": entry.get("name"), "price": entry["amount"], "type": entry.get("type")}
+        for entry in normalized
+    ]
+    for entry, fingerprint in zip(normalized, fingerprint_items(typed_keys)):
+        entry["fingerprint"] = fingerprint
+    return normalized
+
+
+def summarize_import(normalized, imported_path=IMPORTED_PATH):
+    """
+    Zählt, wie viele Items beim Import neu, bereits importiert oder unvollständig
+    wären. Der Import selbst liest die typisierten Felder aus dem Ergebnis-Store.
+    """
+    imported = imported_fingerprints(imported_path)
+    new_rows = skipped_invalid = skipped_duplicate = 0
+    for entry in normalized:
+        name = (entry.get("name") or "").strip()
+        # Gleiche Regel wie die Import-Route: Betrag muss positiv sein
+        if not name or entry["amount"] is None or entry["amount"] <= 0 or not entry["date_iso"]:
+            skipped_invalid += 1
+        elif entry["fingerprint"] in imported:
+            skipped_duplicate += 1
+        else:
+            new_rows += 1
+
+    log(
+        "info",
+        "🧮 Import vorbereitet",
+        new_rows=new_rows,
+        duplicates=skipped_duplicate,
+        invalid=skipped_invalid,
+    )
+    return {"new_rows": new_rows, "duplicates": skipped_duplicate, "invalid": skipped_invalid}
@@ -6,9 +6,21 @@ import numpy as np
 import pytesseract
 import json
 import sys
+import time
 import traceback
 from datetime import datetime
 
+from memory_monitor import low_memory_mode
+from deadline import call_timeout, expired, record_degradation, remaining
+from layout_profile import (
+    LAYOUT_CACHE_PATH,
+    field_extent,
+    get_layout_profile,
+    save_widened_profile,
+    widen_extent,
+    window_key,
+)
+
 
 # === LOGGING HELPER ===
 STEP_NAME = "ocr"
@@ -33,96 +45,342 @@ def log(level: str, message: str, step: str | None = STEP_NAME, **data):
 EXPENSE_LAB = np.array([39.0, 66.0, -55.0], dtype=np.float32)
 INCOME_LAB = np.array([78.0, -55.0, 52.0], dtype=np.float32)
 
+# OpenCV liefert Lab bei uint8-Bildern skaliert: L * 255/100, a + 128, b + 128
+_LAB_U8_SCALE = np.array([255.0 / 100.0, 1.0, 1.0], dtype=np.float32)
+_LAB_U8_OFFSET = np.array([0.0, 128.0, 128.0], dtype=np.float32)
+_REFERENCE_LAB = np.stack([EXPENSE_LAB, INCOME_LAB])
+_REFERENCE_TYPES = ("expense", "income")
+
+
+def _inner_region(region_rgb: np.ndarray) -> np.ndarray:
+    """Schneidet den Rand einer Preis-ROI ab (View, keine Kopie)."""
+    h, w = region_rgb.shape[:2]
+    if h > 4 and w > 4:
+        border_h = max(1, int(h * 0.2))
+        border_w = max(1, int(w * 0.1))
+        cropped = region_rgb[border_h:h - border_h, border_w:w - border_w]
+        if cropped.size > 0:
+            return cropped
+    return region_rgb
+
+
+def classify_amounts_from_color(
+    regions_rgb: list[np.ndarray | None],
+    bgr: bool = False,
+) -> list[tuple[str | None, list[float] | None]]:
+    """
+    Klassifiziert alle Preis-ROIs eines Durchlaufs auf einmal als expense/income.
+
+    Alle Pixel werden in einem einzigen cvtColor-Aufruf nach uint8-Lab konvertiert,
+    die Mediane pro ROI in echte Lab-Einheiten zurückgerechnet und erst dann die
+    Distanz zu EXPENSE_LAB/INCOME_LAB bestimmt (sonst zählte L 2,55-fach).
+    Rückgabe: pro ROI (type, [L, a, b]) mit Lab in echten Einheiten.
+    bgr=True: ROIs sind Views direkt aus dem BGR-Bild (spart die RGB-Kopie).
+    """
+    results: list[tuple[str | None, list[float] | None]] = [(None, None)] * len(regions_rgb)
+
+    indices = []
+    pixel_blocks = []
+    for idx, region in enumerate(regions_rgb):
+        if region is None or region.size == 0:
+            continue
+        inner = _inner_region(region)
+        indices.append(idx)
+        pixel_blocks.append(inner.reshape(-1, 3))
+
+    if not pixel_blocks:
+        return results
+
+    try:
+        counts = [len(block) for block in pixel_blocks]
+        all_pixels = np.ascontiguousarray(np.concatenate(pixel_blocks), dtype=np.uint8)
+        all_lab = cv2.cvtColor(all_pixels.reshape(-1, 1, 3), cv2.COLOR_BGR2LAB if bgr else cv2.COLOR_RGB2LAB).reshape(-1, 3)
+
+        # Farbige, nicht-weiße Pixel (Text) bevorzugen
+        L = all_lab[:, 0]
+        a = all_lab[:, 1].astype(np.int16)
+        b = all_lab[:, 2].astype(np.int16)
+        color_mask = (L < 240) & ((np.abs(a - 128) > 4) | (np.abs(b - 128) > 4))
+
+        medians = np.empty((len(pixel_blocks), 3), dtype=np.float32)
+        offsets = np.cumsum([0] + counts)
+        for k in range(len(pixel_blocks)):
+            lab_slice = all_lab[offsets[k]:offsets[k + 1]]
+            mask_slice = color_mask[offsets[k]:offsets[k + 1]]
+            if np.count_nonzero(mask_slice) > 10:
+                lab_slice = lab_slice[mask_slice]
+            medians[k] = np.median(lab_slice, axis=0)
+
+        # Distanzen aller ROIs zu beiden Referenzfarben in einem Schritt (echte Lab-Einheiten)
+        medians_lab = (medians - _LAB_U8_OFFSET) / _LAB_U8_SCALE
+        distances = np.linalg.norm(medians_lab[:, None, :] - _REFERENCE_LAB[None, :, :], axis=2)
+        nearest = np.argmin(distances, axis=1)
+
+        for k, idx in enumerate(indices):
+            lab_values = [round(float(v), 2) for v in medians_lab[k]]
+            if np.isnan(distances[k]).any():
+                results[idx] = (None, lab_values)
+            else:
+                results[idx] = (_REFERENCE_TYPES[nearest[k]], lab_values)
+    except Exception as exc:
+        log("warning", "⚠️ Farbklassifikation fehlgeschlagen", error=str(exc))
+
+    return results
+
 
 def classify_amount_from_color(region_rgb: np.ndarray | None) -> tuple[str | None, list[float] | None]:
-    if region_rgb is None or region_rgb.size == 0:
-        return None, None
+    return classify_amounts_from_color([region_rgb])[0]
+
+
+def prepare_planes(image_BGR):
+    """
+    Berechnet alle Ebenen für die OCR genau einmal (uint8, ohne Zusatzkopien):
+    gray, thresh (weiße Karten) und das Integralbild der dunklen Pixel für
+    O(1)-Zählungen in Rechtecken. Die Maske fürs erste Datum entsteht erst in
+    read_first_date, an der Position aus Profil und Offset.
+    """
+    gray = cv2.cvtColor(image_BGR, cv2.COLOR_BGR2GRAY)
+    _, thresh = cv2.threshold(gray, 253, 255, cv2.THRESH_BINARY)
+    # dunkel = 1 überall dort, wo thresh == 0 – aus thresh abgeleitet, kein zweiter Schwellwert-Lauf
+    dark = (thresh == 0).view(np.uint8)
+    dark_integral = cv2.integral(dark, sdepth=cv2.CV_32S)
+    del dark
+    return {
+        "bgr": image_BGR,
+        "gray": gray,
+        "thresh": thresh,
+        "dark_integral": dark_integral,
+    }
+
 
+def dark_pixels(integral, x0, y0, x1, y1):
+    """Anzahl dunkler Pixel (thresh == 0) im Rechteck [x0, x1) × [y0, y1) in O(1)."""
+    h, w = integral.shape[0] - 1, integral.shape[1] - 1
+    x0, x1 = max(0, min(x0, w)), max(0, min(x1, w))
+    y0, y1 = max(0, min(y0, h)), max(0, min(y1, h))
+    if x1 <= x0 or y1 <= y0:
+        return 0
+    return int(integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0])
+
+
+# Konturen ab dieser Fläche sind Transaktionskarten
+CARD_MIN_AREA = 50000
+
+# Bei Zeitnot wird in dieser Reihenfolge auf Felder verzichtet; Preis und Name bleiben
+OPTIONAL_FIELDS = ("tag", "category")
+REQUIRED_CALLS = 2  # price + name
+TESSERACT_TIMEOUT_MESSAGE = "Tesseract process timeout"
+# Homebrew-Installation von tesseract inkl. Sprachdaten (deu)
+TESSERACT_CMD = "/opt/homebrew/bin/tesseract"
+TESSDATA_PREFIX = "/opt/homebrew/share/tessdata/"
+
+
+def configure_tesseract():
+    """tesseract-Pfade setzen – aufgerufen von jedem OCR-Einstieg (ocr_extract, ocr_cards)."""
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+    os.environ["TESSDATA_PREFIX"] = TESSDATA_PREFIX
+
+
+def read_text(region, config='--psm 6', stats=None):
+    """tesseract mit Timeout aus dem Stage-Budget; ein Timeout liefert leeren Text."""
+    started_at = time.perf_counter()
     try:
-        roi = region_rgb.astype(np.float32)
+        return pytesseract.image_to_string(region, lang="deu", config=config, timeout=call_timeout())
+    except RuntimeError as exc:
+        if str(exc) != TESSERACT_TIMEOUT_MESSAGE:
+            raise
+        if stats is not None:
+            stats["timeouts"] += 1
+        log("warning", "⏱️ Tesseract-Timeout, Feld bleibt leer")
+        return ""
+    finally:
+        if stats is not None:
+            stats["calls"] += 1
+            stats["seconds"] += time.perf_counter() - started_at
+
+
+def fields_to_skip(items_left, stats, skipped):
+    """
+    Streicht optionale Felder (erst tag, dann category), bis die restlichen Items
+    mit der gemessenen Zeit pro tesseract-Aufruf ins Restbudget passen.
+    """
+    left = remaining()
+    if left is None or items_left <= 0 or not stats["calls"]:
+        return skipped
+    seconds_per_call = stats["seconds"] / stats["calls"]
+    affordable_calls = left / (seconds_per_call * items_left)
+    needed_calls = REQUIRED_CALLS + sum(1 for field in OPTIONAL_FIELDS if field not in skipped)
+    for field in OPTIONAL_FIELDS:
+        if affordable_calls >= needed_calls:
+            break
+        if field not in skipped:
+            skipped = skipped | {field}
+            needed_calls -= 1
+    return skipped
+
+
+def scan_field(planes, profile, field, x, y, x_offset=0, y_offset=0, destinations=()):
+    """
+    Liefert (x, y, height, length) eines Feldes über den Profil-Lookup. Reicht das
+    Feld bis an die gecachte Ausdehnung, wird bis zur Kartenkante nachgemessen.
+    """
+    dx, dy, height, buffer, mode, source = profile["anchors"][field]
+    fx, fy = x + dx + x_offset, y + dy + y_offset
+    integral = planes["dark_integral"] if source == "thresh" else None
+    extent, limit = profile["extents"][field], profile["limits"][field]
+    length = field_extent(planes[source], fx, fy, height, extent, buffer, mode, integral=integral)
+    if length >= extent and extent < limit:
+        length = field_extent(planes[source], fx, fy, height, limit, buffer, mode, integral=integral)
+        widen_extent(profile, field, length)
+    for destination in destinations:
+        draw_field(destination, fx, fy, height, length, mode)
+    return fx, fy, height, length
+
+
+def read_first_date(planes, profile, stats, destinations=(), y_offset=0):
+    """Datum im Kopfbereich über der ersten Karte ("" wenn keins gefunden)."""
+    fx, fy, fh, fb = profile["first_date"]
+    fy += y_offset
+    # Maske nur für die Zeilen des Datumsfeldes berechnen – dort, wo es in diesem Bild liegt
+    gray = planes["gray"]
+    y0, y1, x0 = max(0, fy), max(0, min(gray.shape[0], fy + fh)), max(0, fx)
+    first_date_length = 0
+    if y1 > y0:
+        _, first_date_mask = cv2.threshold(gray[y0:y1, x0:], 190, 255, cv2.THRESH_BINARY_INV)
+        first_date_length = field_extent(first_date_mask, 0, 0, y1 - y0, first_date_mask.shape[1], fb, 'starting_left')
+    for destination in destinations:
+        draw_field(destination, fx, fy, fh, first_date_length, 'starting_left')
+    if first_date_length <= 0:
+        return ""
+    first_date = read_text(gray[y0:y1, x0:x0 + first_date_length], stats=stats).strip()
+    log("info", "📅 Erstes Datum erkannt", date=first_date)
+    return first_date
+
+
+def read_card_date(planes, profile, x, y, stats, destinations=()):
+    """Datums-Überschrift direkt über der Karte bei (x, y)."""
+    dx, dy, dh, length_date = scan_field(planes, profile, "date", x, y, destinations=destinations)
+    return read_text(planes["gray"][dy:dy + dh, dx:dx + length_date], stats=stats).strip()
+
+
+def read_card(planes, profile, x, y, stats, skipped_fields=frozenset(), destinations=()):
+    """
+    OCR von tag, price, name und category einer Karte mit linker oberer Ecke (x, y).
+    Gibt (Felder, Preis-ROI aus dem unbemalten BGR-Bild) zurück.
+    """
+    gray, metrics = planes["gray"], profile["metrics"]
+    gap = metrics["field_gap"]
+
+    # Tag 
+    a = b = 0
+    tx, ty, th, lenght1 = scan_field(planes, profile, "tag", x, y)
+    black_pixel = dark_pixels(planes["dark_integral"], tx, ty, tx + lenght1, ty + th)
+    tag = ""
+    if black_pixel > metrics["tag_dark_min"]:
+        for destination in destinations:
+            draw_field(destination, tx, ty, th, lenght1, 'starting_left')
+        b, a = lenght1 + gap, metrics["tag_name_shift"]
+        # Layout-Verschiebung bleibt, nur der Text wird bei Zeitnot nicht gelesen
+        if "tag" not in skipped_fields:
+            tag = read_text(gray[ty:ty + th, tx:tx + lenght1], stats=stats)
+
+    # Price
+    px, py, ph, lenght3 = scan_field(planes, profile, "price_probe", x, y)
+    black_pixel1 = dark_pixels(planes["dark_integral"], px, py, px + lenght3, py + ph)
+    c = lenght3 + gap if black_pixel1 > metrics["price_dark_min"] else 0
+    px, py, ph, lenght3 = scan_field(planes, profile, "price", x, y, x_offset=-c, destinations=destinations)
+    price_config = '--oem 3 --psm 7 -c tessedit_char_whitelist="-−0123456789,. €$" --psm 7'
+    price_slice = (slice(py, py + ph), slice(px - lenght3, px))
+    price = read_text(gray[price_slice], config=price_config, stats=stats)
+    if len(price) > 5 and "," not in price:
+        price = price[:-5] + "," + price[-5:]
+
+    # Name
+    nx, ny, nh, lenght2 = scan_field(planes, profile, "name", x, y, y_offset=-a, destinations=destinations)
+    name = read_text(gray[ny:ny + nh, nx:nx + lenght2], stats=stats)
+
+    # Category
+    category = ""
+    if "category" not in skipped_fields:
+        cx, cy, ch, lenght4 = scan_field(planes, profile, "category", x, y, x_offset=b, destinations=destinations)
+        category = read_text(gray[cy:cy + ch, cx:cx + lenght4], stats=stats)
+
+    fields = {
+        "name": name.strip(),
+        "category": category.strip(),
+        "price": price.strip(),
+        "tag": tag.strip(),
+    }
+    # Farbe aus dem unbemalten Bild sampeln (Debug-Kopien enthalten bereits Rechtecke)
+    return fields, planes["bgr"][price_slice]
 
-        h, w, _ = roi.shape
-        if h > 4 and w > 4:
-            border_h = max(1, int(h * 0.2))
-            border_w = max(1, int(w * 0.1))
-            cropped = roi[border_h:h - border_h, border_w:w - border_w]
-            if cropped.size > 0:
-                roi = cropped
 
-        roi_bgr = cv2.cvtColor(roi, cv2.COLOR_RGB2BGR)
-        roi_lab = cv2.cvtColor(roi_bgr, cv2.COLOR_BGR2LAB)
+def update_skipped_fields(items_left, stats, skipped_fields, item_index):
+    """fields_to_skip anwenden und neu gestrichene Felder als Degradierung melden."""
+    now_skipped = fields_to_skip(items_left, stats, skipped_fields)
+    for field in OPTIONAL_FIELDS:
+        if field in now_skipped and field not in skipped_fields:
+            record_degradation("field_skipped", field=field, from_item=item_index)
+    return now_skipped
 
-        pixels = roi_lab.reshape(-1, 3)
 
-        L = pixels[:, 0]
-        a = pixels[:, 1]
-        b = pixels[:, 2]
-        color_mask = (L < 240) & ((np.abs(a - 128) > 4) | (np.abs(b - 128) > 4))
-        if np.count_nonzero(color_mask) > 10:
-            pixels = pixels[color_mask]
+def provisional_type(price):
+    """Typ nur aus dem gelesenen Vorzeichen – Fallback, solange (oder falls) die Farbe fehlt."""
+    return "expense" if "-" in price or "−" in price else "income"
 
-        avg_lab = np.median(pixels, axis=0)
 
-        dist_expense = np.linalg.norm(avg_lab - EXPENSE_LAB)
-        dist_income = np.linalg.norm(avg_lab - INCOME_LAB)
+def classify_item_types(items, price_regions):
+    """
+    Setzt type, Vorzeichen und color_lab aller Items über eine gesammelte Farbklassifikation.
+    Die Items selbst werden schon beim Lesen geloggt; hier folgt ein Event mit allen Typen.
+    """
+    color_results = classify_amounts_from_color(price_regions, bgr=True)
+    for item, (color_type, color_lab) in zip(items, color_results):
+        price_clean = item["price"]
+        detected_type = provisional_type(price_clean) if color_type is None else color_type
 
-        if np.isnan(dist_expense) or np.isnan(dist_income):
-            return None, avg_lab.tolist()
+        normalized = price_clean.lstrip("-−+")
+        if detected_type == "expense":
+            price_clean = f"-{normalized}" if normalized else "-0,00"
+        else:
+            price_clean = normalized
 
-        detected = "expense" if dist_expense <= dist_income else "income"
-        return detected, avg_lab.tolist()
-    except Exception:
-        return None, None
+        item["price"] = price_clean.strip()
+        item["type"] = detected_type
+        item["color_lab"] = color_lab
+
+    log(
+        "info",
+        "🎨 Preisfarben klassifiziert",
+        types=[item["type"] for item in items],
+        prices=[item["price"] for item in items],
+        expense=sum(1 for item in items if item["type"] == "expense"),
+        income=sum(1 for item in items if item["type"] == "income"),
+    )
+    return items
 
 
+def draw_field(destination, x, y, height, length, mode):
+    """Zeichnet den von field_extent gefundenen Bereich als Rechteck ein."""
+    x1 = x if mode == 'starting_left' else x - length + 4
+    x2 = x + length - 4 if mode == 'starting_left' else x
+    cv2.rectangle(destination, (x1, y), (x2, y + height), (255, 0, 0), 1)
 
-def boxdrawer(start_x, start_y, height, source, destination, mode, buffer, draw):
-    import cv2, numpy as np
-    k = white_rows = 0
-    step = 1 if mode == 'starting_left' else -1
-    
-    # Bildgrenzen ermitteln
-    max_width = source.shape[1]
-    max_height = source.shape[0]
-    
-    get_pixel = lambda x: source[start_y:start_y + height, x]
-    cond = lambda px: np.sum(px < 100) if mode == 'starting_left' else np.sum(px == 0)
-    
-    while white_rows < buffer:
-        # Berechne die aktuelle X-Position
-        current_x = start_x + k if mode == 'starting_left' else start_x - k
-        
-        # Prüfe ob wir noch im Bild sind
-        if current_x < 0 or current_x >= max_width:
-            break
-            
-        px = get_pixel(current_x)
-        if cond(px) > 0: white_rows = 0
-        else: white_rows += 1
-        k += 1
-    if draw:
-        x1 = start_x if mode == 'starting_left' else start_x - k + 4
-        x2 = start_x + k - 4 if mode == 'starting_left' else start_x
-        cv2.rectangle(destination, (x1, start_y), (x2, start_y + height), (0, 0, 255), 1)
-    return k
-
-def ocr_extract(stitched_path, debug_path):
+
+def ocr_extract(stitched_path, debug_path, window_size=None, layout_cache_path=LAYOUT_CACHE_PATH, debug=True):
 
     log("info", "🔍 Starte OCR-Extraktion", path=stitched_path)
     
-    pytesseract.pytesseract.tesseract_cmd = "/opt/homebrew/bin/tesseract"
-    os.environ["TESSDATA_PREFIX"] = "/opt/homebrew/share/tessdata/"
+    configure_tesseract()
         
     # Image laden
     log("info", "📂 Lade Bild", path=stitched_path)
     image_BGR = cv2.imread(stitched_path)
 
-    # Preprocessing
-    log("info", "🔧 Preprocessing: Konvertiere zu RGB und Graustufen")
-    image_RGB = cv2.cvtColor(image_BGR, cv2.COLOR_BGR2RGB)
-    gray = cv2.cvtColor(image_BGR, cv2.COLOR_BGR2GRAY)
-    _, thresh = cv2.threshold(gray, 253, 255, cv2.THRESH_BINARY) 
-    _, first_date_mask = cv2.threshold(gray, 190, 255, cv2.THRESH_BINARY_INV) # für erstes Datum
+    # Preprocessing: alle Ebenen einmal berechnen
+    log("info", "🔧 Preprocessing: Graustufen, Threshold und Integralbild")
+    planes = prepare_planes(image_BGR)
+    gray, thresh = planes["gray"], planes["thresh"]
     log("info", "🔍 Suche Konturen für Transaktionsboxen")
     contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     
@@ -140,7 +398,7 @@ def ocr_extract(stitched_path, debug_path):
     log("info", "📊 Alle Konturen gefunden", total_contours=len(contour_stats))
     
     # Kategorisieren und filtern
-    transaction_boxes = [s for s in contour_stats if s['area'] > 50000]
+    transaction_boxes = [s for s in contour_stats if s['area'] > CARD_MIN_AREA]
     log("info", "📦 Transaktionsboxen gefiltert", count=len(transaction_boxes))
     
     # Summary: Contour-Statistiken (für Dashboard)
@@ -180,151 +438,101 @@ def ocr_extract(stitched_path, debug_path):
     # Transaktions-Boxen nach Y-Position sortieren (von oben nach unten)
     transaction_boxes_sorted = sorted(transaction_boxes, key=lambda x: x['y'])
 
-    # Boxdrawer für Text-Bereiche 
-    black = cv2.cvtColor(thresh.copy(), cv2.COLOR_GRAY2BGR)
-    OG = image_RGB.copy()
+    # Annotiertes Ergebnisbild (BGR) nur, wenn Debug-Ausgabe gewünscht und Speicher da ist
+    debug = debug and not low_memory_mode()
+    OG = image_BGR.copy() if debug else None
+    annotated = (OG,) if debug else ()
 
-    first_date_length = boxdrawer(start_x=1110, start_y=9, height=26, 
-                                 source=first_date_mask, destination=OG, 
-                                 mode='starting_left', buffer=12, draw=True)
-    first_date = ""
-    if first_date_length > 0:
-        first_date = pytesseract.image_to_string(gray[9:9 + 26, 1110:1110 + first_date_length], lang="deu", config='--psm 6').strip()
-        log("info", "📅 Erstes Datum erkannt", date=first_date)
+    # Layout-Profil: Feld-Anker und maximale Ausdehnungen pro Fenstergröße
+    profile = get_layout_profile(
+        window_key(window_size, image_BGR.shape[1]),
+        transaction_boxes_sorted,
+        planes,
+        layout_cache_path,
+    )
 
-    
+    tesseract_stats = {"calls": 0, "seconds": 0.0, "timeouts": 0}
+    skipped_fields = frozenset()
 
+    first_date = read_first_date(planes, profile, tesseract_stats, destinations=annotated)
 
-    # Arrays für Koordinaten (wie im Original)
-    widht = []
-    hight = []
-    x_coord = []
-    y_coord = []
     io_date = 0
     current_date = first_date  # Beginne mit dem ersten Datum
     i = 0
     items = []  # Für OCR-Ergebnisse wie in text_recog.py
+    price_regions = []  # Preis-ROIs für die gesammelte Farbklassifikation
 
     
     # Loop über transaction_boxes (bereits gefiltert!)
     for box_stats in transaction_boxes_sorted:
         x, y, w, h = box_stats['x'], box_stats['y'], box_stats['w'], box_stats['h']
-        
+
+        # Zeitbudget: erst optionale Felder streichen, erst danach Items auslassen
+        if expired():
+            record_degradation("ocr_truncated", processed_items=i, total_items=len(transaction_boxes_sorted))
+            break
+        skipped_fields = update_skipped_fields(len(transaction_boxes_sorted) - i, tesseract_stats, skipped_fields, i + 1)
+
         i += 1
-        widht.append(w)
-        hight.append(h)
-        x_coord.append(x)
-        y_coord.append(y)
 
         # Draw bounding box 
-        cv2.rectangle(black, (x, y), (x + w, y + h), (255, 0, 0), 2)
-        cv2.rectangle(OG, (x, y), (x + w, y + h), (255, 0, 0), 2)
+        for destination in annotated:
+            cv2.rectangle(destination, (x, y), (x + w, y + h), (0, 0, 255), 2)
 
         # Date 
-        length_date = 0
         if y - io_date > 20 + h:
-            length_date = boxdrawer(start_x=x+20, start_y=y-33, height=26, source=gray, destination=OG, mode='starting_left', buffer=12, draw=True)
-            new_date = pytesseract.image_to_string(gray[y-33:y-33 + 26, x+20:x+20 + length_date], lang="deu", config='--psm 6').strip()
+            new_date = read_card_date(planes, profile, x, y, tesseract_stats, destinations=annotated)
             if new_date: 
                 current_date = new_date
                 log("info", "📅 Neues Datum erkannt", date=current_date, item=i)
 
-
-        # Tag 
-        a = b = 0
-        lenght1 = boxdrawer(start_x=x + 102, start_y=y + 56, height=38, source=thresh, destination=black, mode='starting_left', buffer=3, draw=False)
-        row_pixel = black[y + 56:y + 56 + 38, x + 102:x + 102 + lenght1]
-        black_pixel = np.sum(row_pixel == 0)
-        tag = ""
-        if black_pixel > 10000:
-            lenght1 = boxdrawer(start_x=x + 102, start_y=y + 56, height=38, source=thresh, destination=black, mode='starting_left', buffer=3, draw=True)
-            lenght1 = boxdrawer(start_x=x + 102, start_y=y + 56, height=38, source=thresh, destination=OG, mode='starting_left', buffer=3, draw=True)
-            b, a = lenght1 + 3, 5
-            tag = pytesseract.image_to_string(gray[y + 56:y + 56 + 38, x + 102:x + 102 + lenght1], lang="deu", config='--psm 6')
-
-
-
-        # Price
-        lenght3 = boxdrawer(start_x=x + 733, start_y=y + 35, height=40, source=thresh, destination=black, mode='starting_right', buffer=3, draw=False)
-        black_pixel1 = np.sum(black[y + 35:y + 35 + 40, x + 733:x + 733 + lenght3] == 0)
-        c = lenght3 + 3 if black_pixel1 > 1000 else 0
-        lenght3 = boxdrawer(start_x=x + 725 - c, start_y=y + 35, height=40, source=thresh, destination=OG, mode='starting_right', buffer=12, draw=True)
-        price_config = '--oem 3 --psm 7 -c tessedit_char_whitelist="-−0123456789,. €$" --psm 7'
-        price_slice = (slice(y + 35, y + 35 + 40), slice(x + 725 - c - lenght3, x + 725 - c))
-        price_gray = gray[price_slice]
-        price_rgb = OG[price_slice]
-        price = pytesseract.image_to_string(price_gray, lang="deu", config=price_config)
-        if len(price) > 5 and "," not in price:
-            price = price[:-5] + "," + price[-5:]
-
-        price_clean = price.strip()
-        has_minus = "-" in price_clean or "−" in price_clean
-        color_type, color_lab = classify_amount_from_color(price_rgb)
-        if color_type is None:
-            detected_type = "expense" if has_minus else "income"
-        else:
-            detected_type = color_type
-
-        normalized = price_clean.lstrip("-−+")
-        if detected_type == "expense":
-            price_clean = f"-{normalized}" if normalized else "-0,00"
-        else:
-            price_clean = normalized
-
-        price = price_clean.strip()
-
-        # Name
-        lenght2 = boxdrawer(start_x=x + 98, start_y=y + 20 - a, height=35, source=thresh, destination=black, mode='starting_left', buffer=12, draw=True)
-        lenght2 = boxdrawer(start_x=x + 98, start_y=y + 20 - a, height=35, source=thresh, destination=OG, mode='starting_left', buffer=12, draw=True)
-        name = pytesseract.image_to_string(gray[y + 20 - a:y + 20 - a + 35, x + 98:x + 98 + lenght2], lang="deu", config='--psm 6')
-
-        # Category
-        lenght4 = boxdrawer(start_x=x + 98 + b, start_y=y + 59, height=35, source=thresh, destination=black, mode='starting_left', buffer=12, draw=True)
-        lenght4 = boxdrawer(start_x=x + 98 + b, start_y=y + 59, height=35, source=thresh, destination=OG, mode='starting_left', buffer=12, draw=True)
-        category = pytesseract.image_to_string(gray[y + 59:y + 59 + 35, x + 98 + b:x + 98 + b + lenght4], lang="deu", config='--psm 6')
-
-        # OCR-Ergebnisse ausgeben und sammeln 
-        log("info", f"📝 Item {i} verarbeitet", 
-            name=name.strip(), 
-            category=category.strip(), 
-            price=price.strip(), 
-            tag=tag.strip(),
-            date=current_date,
-            type=detected_type,
-            color_lab=color_lab)
-        items.append({
-            "name": name.strip(),
-            "category": category.strip(),
-            "price": price.strip(),
-            "tag": tag.strip(),
-            "date": current_date,
-            "type": detected_type,
-            "color_lab": color_lab,
-        })
+        # Tag, Price, Name, Category – Typ wird nach dem Loop gesammelt klassifiziert
+        fields, price_region = read_card(planes, profile, x, y, tesseract_stats, skipped_fields, destinations=annotated)
+        items.append({**fields, "date": current_date})
+        price_regions.append(price_region)
+        # Typ vorläufig aus dem Vorzeichen; "🎨 Preisfarben klassifiziert" liefert den endgültigen
+        log("info", f"📝 Item {i} verarbeitet", **items[-1], type=provisional_type(fields["price"]), type_provisional=True)
 
 
         # Nummer auf Image
         text = str(i)
         font = cv2.FONT_HERSHEY_SIMPLEX
         font_scale, thickness = 1, 2
-        color = (255, 0, 0)
+        color = (0, 0, 255)
         text_size = cv2.getTextSize(text, font, font_scale, thickness)[0]
         text_x = x + w // 2 - text_size[0] // 2
         text_y = y + h // 2 + text_size[1] // 2
 
-        cv2.putText(black, text, (text_x, text_y + 30), font, font_scale, color, thickness)
-        cv2.putText(OG, text, (text_x, text_y + 30), font, font_scale, color, thickness)
+        for destination in annotated:
+            cv2.putText(destination, text, (text_x, text_y + 30), font, font_scale, color, thickness)
 
 
         io_date = y
 
 
-    # Convert RGB back to BGR für OpenCV speichern
-    OG_BGR = cv2.cvtColor(OG, cv2.COLOR_RGB2BGR)
-    
-    cv2.imwrite(os.path.join(debug_path, 'ocr_threshold.png'), thresh)
-    cv2.imwrite(os.path.join(debug_path, 'ocr_result.png'), OG_BGR)
+    # Farbklassifikation aller Preise in einem Aufruf
+    classify_item_types(items, price_regions)
+    save_widened_profile(profile, layout_cache_path)
 
-    log("info", "✅ OCR Pipeline abgeschlossen", total_items=len(items))
+    cv2.imwrite(os.path.join(debug_path, 'ocr_threshold.png'), thresh)
+    result_path = os.path.join(debug_path, 'ocr_result.png')
+    if debug:
+        cv2.imwrite(result_path, OG)
+    elif os.path.exists(result_path):
+        # Kein Ergebnisbild aus einem früheren Lauf anzeigen
+        os.remove(result_path)
+
+    if tesseract_stats["timeouts"]:
+        record_degradation("tesseract_timeouts", count=tesseract_stats["timeouts"], calls=tesseract_stats["calls"])
+
+    log(
+        "info",
+        "✅ OCR Pipeline abgeschlossen",
+        total_items=len(items),
+        tesseract_calls=tesseract_stats["calls"],
+        tesseract_s=round(tesseract_stats["seconds"], 2),
+        skipped_fields=sorted(skipped_fields),
+        result_image=debug,
+    )
 
     return items
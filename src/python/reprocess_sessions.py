@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, UTC
+
+from scroll_overlap import CROP_BOTTOM_OFFSET
+from stitch_overlap import stitch_scroll_sequence
+from ocr_extract import ocr_extract
+from normalize_items import normalize_items
+from session_archive import SESSIONS_DIR, list_sessions, load_session, restore_frames, save_session_result
+
+
+# === LOGGING HELPER ===
+STEP_NAME = "reprocess"
+
+
+def log(level: str, message: str, step: str | None = STEP_NAME, **data):
+    """Strukturiertes Logging für SSE Stream."""
+    payload = {
+        "level": level,
+        "message": message,
+        "timestamp": datetime.now(UTC).isoformat().replace("+00:00", "Z"),
+    }
+    if step:
+        payload["step"] = step
+    if data:
+        payload["data"] = data
+    print("LOG:", json.dumps(payload, ensure_ascii=False))
+    sys.stdout.flush()
+
+
+def capture_time(metadata):
+    """Aufnahmezeitpunkt der Session (lokal) – Bezugsjahr für Datumsangaben ohne Jahr."""
+    created_at = metadata.get("created_at")
+    if not created_at:
+        return None
+    return datetime.fromisoformat(created_at.replace("Z", "+00:00")).astimezone()
+
+
+def reprocess_session(session_id, label, sessions_dir=SESSIONS_DIR, keep_workdir=False):
+    """
+    Stitch + OCR + Normalisierung für eine archivierte Session in einem eigenen
+    Arbeitsverzeichnis (Crop beim Laden). Ergebnisse sind wie im Live-Lauf typisiert.
+    """
+    started_at = time.perf_counter()
+    workdir = os.path.join(sessions_dir, session_id, "work")
+    shots_path = os.path.join(workdir, "shots")
+    stitched_path = os.path.join(workdir, "stitched.png")
+    debug_path = os.path.join(workdir, "debug")
+
+    if os.path.exists(workdir):
+        shutil.rmtree(workdir)
+    os.makedirs(shots_path, exist_ok=True)
+    os.makedirs(debug_path, exist_ok=True)
+
+    try:
+        metadata = load_session(session_id, sessions_dir)
+        restore_frames(session_id, shots_path, sessions_dir)
+        stitch_scroll_sequence(shots_path, stitched_path, os.path.join(debug_path, "stitch"), crop_bottom=CROP_BOTTOM_OFFSET)
+        items = ocr_extract(stitched_path, debug_path, window_size=metadata.get("window"))
+        items = normalize_items(items, run_time=capture_time(metadata))
+        result_path = save_session_result(session_id, items, label, sessions_dir)
+    finally:
+        if not keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "session_id": session_id,
+        "items": len(items),
+        "result": result_path,
+        "duration_s": round(time.perf_counter() - started_at, 3),
+    }
+
+
+def reprocess_sessions(session_ids, label, workers=None, sessions_dir=SESSIONS_DIR, keep_workdir=False):
+    """Verarbeitet mehrere Sessions parallel in einem Prozess-Pool."""
+    log("info", "🚀 Starte Batch-Reprocessing", sessions=len(session_ids), workers=workers, label=label)
+    results, failures = [], []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(reprocess_session, session_id, label, sessions_dir, keep_workdir): session_id
+            for session_id in session_ids
+        }
+        for future in as_completed(futures):
+            session_id = futures[future]
+            try:
+                result = future.result()
+                results.append(result)
+                log("info", "✅ Session verarbeitet", **result)
+            except Exception as exc:
+                failures.append({"session_id": session_id, "error": str(exc)})
+                log("error", "❌ Session fehlgeschlagen", session_id=session_id, error=str(exc))
+
+    log("summary", "📦 Batch-Reprocessing", processed=len(results), failed=len(failures), label=label)
+    return results, failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Stitch + OCR über archivierte Capture-Sessions erneut ausführen")
+    parser.add_argument("sessions", nargs="*", help="Session-IDs (Standard: alle archivierten Sessions)")
+    parser.add_argument("--since", help="Nur Sessions ab diesem Datum (YYYYMMDD)")
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl paralleler Prozesse (Standard: CPU-Anzahl)")
+    parser.add_argument("--label", default=None, help="Name der Ergebnisdatei (Standard: reprocess-<Zeitstempel>)")
+    parser.add_argument("--keep-workdir", action="store_true", help="Zwischenbilder pro Session behalten")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    session_ids = args.sessions or list_sessions(since=args.since)
+    label = args.label or datetime.now(UTC).strftime("reprocess-%Y%m%d-%H%M%S")
+    if not session_ids:
+        log("warning", "⚠️ Keine archivierten Sessions gefunden")
+        sys.exit(0)
+    _, failures = reprocess_sessions(session_ids, label, workers=args.workers, keep_workdir=args.keep_workdir)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, UTC
+
+
+# === KONFIGURATION ===
+# Append-only Ergebnis-Store: eine kompakte JSON-Zeile pro Item, dazu ein kleiner
+# Index mit Byte-Offsets pro Run. Die API liest nur den benötigten Byte-Bereich.
+# Abfragen (letzter Run, ?since, ?pending) gibt es nur in src/lib/ocrResultsStore.ts;
+# Python schreibt und liest nur einzelne Runs für Checkpoints.
+script_path = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.abspath(os.path.join(script_path, "..", "..", "data"))
+RESULTS_PATH = os.path.join(data_dir, "ocr-results.jsonl")
+INDEX_PATH = os.path.join(data_dir, "ocr-results.index.json")
+# Fingerprints bereits importierter Items (wird von /api/process/items/import ergänzt)
+IMPORTED_PATH = os.path.join(data_dir, "ocr-imported.jsonl")
+
+FINGERPRINT_FIELDS = ("date", "name", "price", "type")
+
+
+def _now_iso():
+    return datetime.now(UTC).isoformat().replace("+00:00", "Z")
+
+
+def item_fingerprint(item, occurrence=0):
+    """
+    Stabiler Fingerprint aus (date, name, price, type), unempfindlich für Whitespace/Groß-Klein.
+    occurrence unterscheidet identische Items desselben Tages (z.B. zweimal "Bar 25,00 €").
+    """
+    parts = [re.sub(r"\s+", " ", str(item.get(field) or "")).strip().casefold() for field in FINGERPRINT_FIELDS]
+    parts.append(str(occurrence))
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def fingerprint_items(items):
+    """Fingerprints für eine Item-Liste; identische Items werden durchnummeriert."""
+    seen = {}
+    fingerprints = []
+    for item in items:
+        base = item_fingerprint(item)
+        seen[base] = seen.get(base, -1) + 1
+        fingerprints.append(item_fingerprint(item, seen[base]))
+    return fingerprints
+
+
+def load_index(index_path=INDEX_PATH):
+    try:
+        with open(index_path, "r", encoding="utf-8") as handle:
+            index = json.load(handle)
+        if isinstance(index, dict) and isinstance(index.get("runs"), list):
+            return index
+    except FileNotFoundError:
+        pass
+    return {"runs": []}
+
+
+def _save_index(index, index_path):
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as handle:
+        json.dump(index, handle, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, index_path)
+
+
+def append_run(items, source="capture", run_id=None, results_path=RESULTS_PATH, index_path=INDEX_PATH):
+    """
+    Hängt die Items eines Runs als kompakte Records an den Store an und trägt
+    den Byte-Bereich des Runs in den Index ein. Gibt die Run-ID zurück.
+    """
+    captured_at = _now_iso()
+    run_id = run_id or datetime.now(UTC).strftime("%Y%m%d-%H%M%S-%f")
+    lines = []
+    computed = fingerprint_items(items)
+    for position, item in enumerate(items):
+        fingerprint = item.get("fingerprint") or computed[position]
+        record = {"run_id": run_id, "captured_at": captured_at, "position": position, "fingerprint": fingerprint}
+        record.update(item)
+        lines.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+    payload = ("\n".join(lines) + "\n").encode("utf-8") if lines else b""
+
+    os.makedirs(os.path.dirname(results_path), exist_ok=True)
+    with open(results_path, "ab") as handle:
+        offset = handle.tell()
+        handle.write(payload)
+
+    index = load_index(index_path)
+    index["runs"].append({
+        "run_id": run_id,
+        "captured_at": captured_at,
+        "source": source,
+        "offset": offset,
+        "length": len(payload),
+        "count": len(items),
+    })
+    _save_index(index, index_path)
+    return run_id
+
+
+def _read_range(offset, length, results_path):
+    if length <= 0:
+        return []
+    with open(results_path, "rb") as handle:
+        handle.seek(offset)
+        chunk = handle.read(length)
+    return [json.loads(line) for line in chunk.decode("utf-8").splitlines() if line.strip()]
+
+
+def load_run(run_id, results_path=RESULTS_PATH, index_path=INDEX_PATH):
+    """Records eines bestimmten Runs oder None, wenn er nicht im Index steht."""
+    for run in load_index(index_path)["runs"]:
+        if run["run_id"] == run_id:
+            return _read_range(run["offset"], run["length"], results_path)
+    return None
+
+
+def imported_fingerprints(imported_path=IMPORTED_PATH):
+    """Bereits importierte Fingerprints; abgeschnittene oder fremde Zeilen werden übersprungen."""
+    fingerprints = set()
+    try:
+        with open(imported_path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    fingerprint = json.loads(line).get("fingerprint")
+                except (ValueError, AttributeError):
+                    continue
+                if isinstance(fingerprint, str) and fingerprint:
+                    fingerprints.add(fingerprint)
+    except FileNotFoundError:
+        pass
+    return fingerprints
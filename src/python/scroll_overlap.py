@@ -0,0 +1,89 @@
+import json
+import sys
+from datetime import datetime, UTC
+
+import cv2
+
+from stitch_overlap import TEMPLATE_HEIGHT, match_template_y
+
+
+# === LOGGING HELPER ===
+STEP_NAME = "capture"
+
+
+def log(level: str, message: str, step: str | None = STEP_NAME, **data):
+    """Strukturiertes Logging für SSE Stream."""
+    payload = {
+        "level": level,
+        "message": message,
+        "timestamp": datetime.now(UTC).isoformat().replace("+00:00", "Z"),
+    }
+    if step:
+        payload["step"] = step
+    if data:
+        payload["data"] = data
+    print("LOG:", json.dumps(payload, ensure_ascii=False))
+    sys.stdout.flush()
+
+
+# === KONFIGURATION ===
+# Ohne pyautogui/Quartz: Scroll-Regelung und Replay laufen auch außerhalb von macOS
+
+# Crop-Konstanten - nur unten abschneiden, Rest behalten
+CROP_BOTTOM_OFFSET = 1  # Schneide nur 1 Pixel unten ab
+
+SCROLL_AMOUNT = 700  # Start-Scrollweite, danach adaptiv
+
+# Adaptive Scroll-Steuerung: Überlappung knapp über TEMPLATE_HEIGHT halten
+OVERLAP_MARGIN = 40  # Pixel Reserve über TEMPLATE_HEIGHT
+MIN_SCROLL_AMOUNT = 200
+MAX_SCROLL_AMOUNT = 3000
+MIN_MATCH_SCORE = 0.8  # darunter gilt die Messung als unzuverlässig
+FALLBACK_FACTOR = 0.75  # Scrollweite bei unzuverlässiger Messung reduzieren
+
+
+def measure_scroll_overlap(prev_img, next_img, template_height=TEMPLATE_HEIGHT):
+    """
+    Misst, wie weit sich der Inhalt zwischen zwei Frames verschoben hat.
+    Gibt (shift_px, overlap_px, score) zurück – dieselbe Messung wie match_y beim Stitchen.
+    """
+    template_start_y, match_y, score = match_template_y(prev_img, next_img, template_height)
+    shift_px = template_start_y - match_y
+    overlap_px = next_img.shape[0] - shift_px
+    return shift_px, overlap_px, score
+
+
+def next_scroll_amount(requested, shift_px, frame_height, score, template_height=TEMPLATE_HEIGHT):
+    """
+    Regelt die nächste Scrollweite so, dass die Überlappung knapp über
+    template_height + OVERLAP_MARGIN liegt. Das Verhältnis Bildpixel pro
+    Scroll-Einheit (z.B. 2 bei Retina) wird aus der letzten Messung abgeleitet.
+    """
+    if score < MIN_MATCH_SCORE or shift_px <= 0 or requested <= 0:
+        return max(MIN_SCROLL_AMOUNT, int(requested * FALLBACK_FACTOR))
+    px_per_unit = shift_px / requested
+    target_shift_px = frame_height - template_height - OVERLAP_MARGIN
+    amount = int(target_shift_px / px_per_unit)
+    return max(MIN_SCROLL_AMOUNT, min(MAX_SCROLL_AMOUNT, amount))
+
+
+def replay_frame_source(image_path, frame_height, px_per_unit=2.0):
+    """
+    Frame-Quelle zum Testen ohne Bildschirm: schneidet Frames aus einem langen
+    Bild (z.B. stitched.png) aus und simuliert Scrollen über einen Offset.
+    """
+    image = cv2.imread(image_path)
+    if image is None:
+        raise RuntimeError(f"Replay-Bild konnte nicht geladen werden: {image_path}")
+    max_offset = max(0, image.shape[0] - frame_height)
+    state = {"offset": 0}
+
+    def capture(out_path):
+        frame = image[state["offset"]:state["offset"] + frame_height]
+        cv2.imwrite(out_path, frame)
+
+    def scroll(amount):
+        state["offset"] = min(max_offset, state["offset"] + int(round(amount * px_per_unit)))
+
+    window = (0, 0, int(image.shape[1] / px_per_unit), int(frame_height / px_per_unit))
+    return {"capture": capture, "scroll": scroll, "delay": 0, "window": window}
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import sys
+import uuid
+from datetime import datetime, UTC
+
+import cv2
+
+
+# === LOGGING HELPER ===
+STEP_NAME = "archive"
+
+
+def log(level: str, message: str, step: str | None = STEP_NAME, **data):
+    """Strukturiertes Logging für SSE Stream."""
+    payload = {
+        "level": level,
+        "message": message,
+        "timestamp": datetime.now(UTC).isoformat().replace("+00:00", "Z"),
+    }
+    if step:
+        payload["step"] = step
+    if data:
+        payload["data"] = data
+    print("LOG:", json.dumps(payload, ensure_ascii=False))
+    sys.stdout.flush()
+
+
+# === KONFIGURATION ===
+script_path = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.abspath(os.path.join(script_path, "..", "..", "data"))
+SESSIONS_DIR = os.path.join(data_dir, "sessions")
+PNG_COMPRESSION = 9
+
+
+def _blob_path(frame_hash, sessions_dir):
+    # Frames werden inhaltsadressiert und sessionübergreifend nur einmal abgelegt
+    return os.path.join(sessions_dir, "blobs", frame_hash[:2], f"{frame_hash}.png")
+
+
+def _session_dir(session_id, sessions_dir):
+    return os.path.join(sessions_dir, session_id)
+
+
+def frame_hash(image):
+    """SHA-256 über Shape und Pixeldaten (unabhängig von der PNG-Kodierung)."""
+    digest = hashlib.sha256()
+    digest.update(str(image.shape).encode("utf-8"))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def archive_session(shots_path, window=None, sessions_dir=SESSIONS_DIR):
+    """
+    Archiviert die Screenshots einer Capture-Session: jedes Frame wird über seinen
+    Pixel-Hash dedupliziert und verlustfrei (PNG, maximale Kompression) abgelegt.
+    Gibt die Session-ID zurück: Zeitstempel plus zufälliges Suffix, damit zwei
+    Sessions in derselben Sekunde nicht im selben Verzeichnis landen.
+    """
+    session_id = f"{datetime.now(UTC).strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    session_dir = _session_dir(session_id, sessions_dir)
+    os.makedirs(session_dir)
+
+    frames = []
+    new_blobs = 0
+    for filename in sorted(f for f in os.listdir(shots_path) if f.endswith(".png")):
+        image = cv2.imread(os.path.join(shots_path, filename), cv2.IMREAD_UNCHANGED)
+        if image is None:
+            log("warning", "⚠️ Frame nicht lesbar, nicht archiviert", filename=filename)
+            continue
+        digest = frame_hash(image)
+        blob = _blob_path(digest, sessions_dir)
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            tmp_path = blob + ".tmp.png"
+            cv2.imwrite(tmp_path, image, [cv2.IMWRITE_PNG_COMPRESSION, PNG_COMPRESSION])
+            os.replace(tmp_path, blob)
+            new_blobs += 1
+        frames.append({"filename": filename, "hash": digest})
+
+    metadata = {
+        "session_id": session_id,
+        "created_at": datetime.now(UTC).isoformat().replace("+00:00", "Z"),
+        "window": list(window) if window else None,
+        "frames": frames,
+    }
+    with open(os.path.join(session_dir, "session.json"), "w", encoding="utf-8") as handle:
+        json.dump(metadata, handle, ensure_ascii=False, indent=2)
+
+    log("info", "🗄️ Session archiviert", session_id=session_id, frames=len(frames), new_blobs=new_blobs)
+    return session_id
+
+
+def load_session(session_id, sessions_dir=SESSIONS_DIR):
+    with open(os.path.join(_session_dir(session_id, sessions_dir), "session.json"), "r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def list_sessions(sessions_dir=SESSIONS_DIR, since=None):
+    """Sortierte Session-IDs, optional nur ab `since` (Präfix im Format YYYYMMDD)."""
+    if not os.path.isdir(sessions_dir):
+        return []
+    sessions = [
+        name for name in sorted(os.listdir(sessions_dir))
+        if os.path.isfile(os.path.join(sessions_dir, name, "session.json"))
+    ]
+    if since:
+        sessions = [name for name in sessions if name >= since]
+    return sessions
+
+
+def restore_frames(session_id, target_dir, sessions_dir=SESSIONS_DIR):
+    """Schreibt die Frames einer Session als shot_XXX.png nach target_dir zurück."""
+    metadata = load_session(session_id, sessions_dir)
+    os.makedirs(target_dir, exist_ok=True)
+    paths = []
+    for i, frame in enumerate(metadata["frames"]):
+        target = os.path.join(target_dir, f"shot_{i:03d}.png")
+        image = cv2.imread(_blob_path(frame["hash"], sessions_dir), cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise RuntimeError(f"Frame {frame['hash']} fehlt im Archiv (Session {session_id})")
+        cv2.imwrite(target, image)
+        paths.append(target)
+    return paths
+
+
+def save_session_result(session_id, items, label, sessions_dir=SESSIONS_DIR):
+    """Speichert OCR-Ergebnisse einer Session kompakt unter results/<label>.json."""
+    results_dir = os.path.join(_session_dir(session_id, sessions_dir), "results")
+    os.makedirs(results_dir, exist_ok=True)
+    result_path = os.path.join(results_dir, f"{label}.json")
+    with open(result_path, "w", encoding="utf-8") as handle:
+        json.dump(items, handle, ensure_ascii=False, separators=(",", ":"))
+    return result_path
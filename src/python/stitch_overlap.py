@@ -8,6 +8,9 @@ import sys
 import traceback
 from datetime import datetime
 
+from memory_monitor import low_memory_mode, track_stage
+from deadline import expired, record_degradation
+
 # === LOGGING HELFER ===
 STEP_NAME = "stitch"
 
@@ -31,26 +34,19 @@ def log(level: str, message: str, step: str | None = STEP_NAME, **data):
 TEMPLATE_HEIGHT = 170
 
 
-def detect_and_remove_top_border(stitched_path):
+def find_top_border(image):
     """
-    Erkennt den weißen Balken am oberen Rand und schneidet ihn ab.
-    Sucht nach der ersten horizontalen Linie und schneidet dort ab.
-
-    nimmt das bild aus 'stitched_path', speichert das beschnittene bild zurück in 'stitched_path'
+    Erkennt den weißen Balken am oberen Rand: sucht die erste horizontale Linie.
+    Es wird nur das obere Band (max. 300 Zeilen) in Graustufen umgerechnet.
+    Gibt die Zeile zurück, ab der das Bild behalten wird (0 = nichts gefunden).
     """
-    image = cv2.imread(stitched_path)
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    height, width = gray.shape
-    
-    
-    log("info", "🔍 Erkenne oberen weißen Balken")
-    
-    # Suche nach der ersten deutlichen horizontalen Linie
-    cut_y = 0
-    
     # Durchsuche die ersten 300 Pixel von oben
-    search_height = min(300, height)
-    
+    search_height = min(300, image.shape[0])
+    gray = cv2.cvtColor(image[:search_height], cv2.COLOR_BGR2GRAY)
+    height = gray.shape[0]
+
+    log("info", "🔍 Erkenne oberen weißen Balken")
+
     for y in range(10, search_height):
         # Nimm eine horizontale Linie
         line = gray[y, :]
@@ -67,7 +63,6 @@ def detect_and_remove_top_border(stitched_path):
                 
                 # Wenn nächste Linie viel variabler ist, haben wir die Grenze gefunden
                 if next_std > line_std + 30:
-                    cut_y = y + 1
                     line_mean = np.mean(line)
                     log(
                         "info",
@@ -76,17 +71,32 @@ def detect_and_remove_top_border(stitched_path):
                         brightness=float(line_mean),
                         std=float(line_std),
                     )
-                    break
-    
-    if cut_y > 0:
-        # Schneide oberen Bereich ab
-        cropped = image[cut_y:, :]
-        cv2.imwrite(stitched_path, cropped)
-        log("info", "🗑️ Oberer Rand entfernt", removed_height=cut_y)
-        return 
-    else:
-        log("warning", "⚠️ Keine klare horizontale Linie gefunden, Bild bleibt unverändert")
-        return 
+                    return y + 1
+    return 0
+
+
+def match_template_y(base_img: np.ndarray, next_img: np.ndarray, template_height_px: int) -> Tuple[int, int, float]:
+    """
+    Sucht die unteren template_height_px Zeilen von base_img in next_img.
+    Gibt (template_start_y, match_y, score) zurück.
+    """
+    template_height = min(template_height_px, base_img.shape[0], next_img.shape[0])
+    template_start_y = base_img.shape[0] - template_height
+    res = cv2.matchTemplate(next_img, base_img[template_start_y:, :], cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(res)
+    return template_start_y, max_loc[1], float(max_val)
+
+
+def _tail(pieces: list[np.ndarray], height: int) -> np.ndarray:
+    """Die unteren `height` Zeilen des bisher zusammengesetzten Bildes (ohne alles zu kopieren)."""
+    collected, rows = [], 0
+    for piece in reversed(pieces):
+        collected.append(piece)
+        rows += piece.shape[0]
+        if rows >= height:
+            break
+    tail = collected[0] if len(collected) == 1 else np.vstack(collected[::-1])
+    return tail[-height:]
 
 
 def _stitch_pair(
@@ -95,57 +105,61 @@ def _stitch_pair(
     *,
     template_height_px: int,
     step_index: int = 0,
-    debug_path: str = None
-) -> None:
-    """Stitch two images using optimized template matching with absolute pixel values."""
+    debug_path: str = None,
+    debug: bool = True,
+) -> np.ndarray:
+    """
+    Stitch two images using optimized template matching with absolute pixel values.
+    base_img ist nur das untere Ende des bisherigen Bildes; zurückgegeben wird der
+    neue Teil von next_img, der unten angehängt wird.
+    """
     
     # Template aus unteren X Pixeln des base_img extrahieren
-    template_height = min(template_height_px, base_img.shape[0])
-    template_start_y = base_img.shape[0] - template_height
-    template = base_img[template_start_y:, :]
-    search_area = next_img
-    res = cv2.matchTemplate(search_area, template, cv2.TM_CCOEFF_NORMED)
-    _, max_val, _, max_loc = cv2.minMaxLoc(res)
-    match_x, match_y = max_loc
-    
+    template_start_y, match_y, max_val = match_template_y(base_img, next_img, template_height_px)
+    template_height = base_img.shape[0] - template_start_y
+
+    # Crop-Position berechnen
+    crop_start = match_y + template_height
+    remainder = next_img[crop_start:, :]
+
+    if not debug:
+        log(
+            "info",
+            "🔗 Bild zusammengefügt",
+            match_score=f"{max_val*100:.1f}%",
+            match_y=match_y,
+            crop_y=crop_start,
+            remaining_height=remainder.shape[0],
+        )
+        return remainder
+
     # ===  START DEBUG ==========================
     os.makedirs(debug_path, exist_ok=True)
+    thumb_height = next_img.shape[0]
     
     # 1. Template-Bereich markieren (rot)
-    template_vis = base_img.copy()
-    cv2.rectangle(template_vis, (0, template_start_y), (base_img.shape[1], base_img.shape[0]), (0, 0, 255), 5)
+    template_vis = base_img[-thumb_height:].copy()
+    offset = base_img.shape[0] - template_vis.shape[0]
+    cv2.rectangle(template_vis, (0, template_start_y - offset), (base_img.shape[1], template_vis.shape[0]), (0, 0, 255), 5)
 
     # 2. Match-Position markieren (grün)
     match_vis = next_img.copy()
-    cv2.rectangle(match_vis, (match_x, match_y), (match_x + template.shape[1], match_y + template_height), (0, 255, 0), 5)
-
-    thumb_height = next_img.shape[0]
-    template_cropped = template_vis[-thumb_height:, :] if template_vis.shape[0] > thumb_height else template_vis
+    cv2.rectangle(match_vis, (0, match_y), (next_img.shape[1], match_y + template_height), (0, 255, 0), 5)
 
     # DEBUG_ - Bilder speichern
     template_path = os.path.join(debug_path, f"step_{step_index:02d}_1_template.png")
     match_path = os.path.join(debug_path, f"step_{step_index:02d}_2_match.png")
 
-    cv2.imwrite(template_path, template_cropped)
+    cv2.imwrite(template_path, template_vis)
     cv2.imwrite(match_path, match_vis)
-    # =================== END DEBUG ==================================
-
-    # Crop-Position berechnen (eine ganze Zeile entfernen um    # Crop-Position berechnen
-    crop_start = match_y + template_height
-    remainder = next_img[crop_start:, :]
-    combined = np.vstack([base_img, remainder])
-    
 
-    # =================== START DEBUG ====================================
-    # 3. Zusammengefügtes Resultat mit Trennlinie
-    result_vis = combined.copy()
-    split_y = base_img.shape[0]
+    # 3. Zusammengefügtes Resultat mit Trennlinie (nur das untere Ende)
+    result_vis = np.vstack([base_img, remainder])[-thumb_height:]
+    split_y = result_vis.shape[0] - remainder.shape[0]
     cv2.line(result_vis, (0, split_y), (result_vis.shape[1], split_y), (255, 0, 255), 5)
-    result_thumb_height = next_img.shape[0]
-    result_cropped = result_vis[-result_thumb_height:, :] if result_vis.shape[0] > result_thumb_height else result_vis
     
     result_path = os.path.join(debug_path, f"step_{step_index:02d}_3_result.png")
-    cv2.imwrite(result_path, result_cropped)
+    cv2.imwrite(result_path, result_vis)
 
     
     # Alle Infos in einer übersichtlichen Kachel loggen
@@ -160,17 +174,28 @@ def _stitch_pair(
         debug_match=match_path,
         debug_result=result_path,
     )
-    
-    
     # ==================== END DEBUG ====================================
 
-    return combined
+    return remainder
+
+def load_frame(path: str, crop_bottom: int = 0) -> np.ndarray:
+    """Lädt ein Frame und schneidet crop_bottom Zeilen unten ab (View, keine Kopie)."""
+    img = cv2.imread(path)
+    if img is None:
+        raise RuntimeError(f"Frame konnte nicht geladen werden: {path}")
+    return img[:img.shape[0] - crop_bottom] if crop_bottom > 0 else img
+
 
-def stitch_scroll_sequence(cropped_path: str, stitched_path: str, debug_path: str) -> None:
+def stitch_scroll_sequence(frames_path: str, stitched_path: str, debug_path: str, crop_bottom: int = 0) -> None:
+    """
+    Fügt alle Frames aus frames_path zu einem langen Bild zusammen.
+    crop_bottom wird beim Laden als Slice angewendet – Frames müssen dafür
+    nicht vorher beschnitten auf die Platte geschrieben werden.
+    """
 
-    # Alle PNG-Dateien aus cropped_path Verzeichnis holen und sortieren
-    image_files = sorted([f for f in os.listdir(cropped_path) if f.endswith('.png')])
-    frames: list[str] = [os.path.join(cropped_path, f) for f in image_files]
+    # Alle PNG-Dateien aus frames_path Verzeichnis holen und sortieren
+    image_files = sorted([f for f in os.listdir(frames_path) if f.endswith('.png')])
+    frames: list[str] = [os.path.join(frames_path, f) for f in image_files]
     
 
     # Debug-Ordner aufräumen vor jedem Durchlauf
@@ -179,27 +204,43 @@ def stitch_scroll_sequence(cropped_path: str, stitched_path: str, debug_path: st
         shutil.rmtree(debug_path)
     os.makedirs(debug_path, exist_ok=True)
 
-    # Wenn nur 1 Bild: Stitching überspringen, nur Top-Border entfernen
     if len(frames) == 1:
         log("info", "ℹ Nur ein Bild vorhanden, Stitching nicht notwendig") 
-        log("info", " Nachbearbeitung: Entferne oberen Rand") 
-        # Top-Bereich entfernen nimmt einzige Bild path->  speichert in 'stitched_path'
-        detect_and_remove_top_border(frames[0], stitched_path)
-        log("info", " Einzelbild verarbeitet")
-        return 
-
-    
-    log("info", "🚀 Starte Stitching Pipeline", total_frames=len(frames), template_height=TEMPLATE_HEIGHT)
+    else:
+        log("info", "🚀 Starte Stitching Pipeline", total_frames=len(frames), template_height=TEMPLATE_HEIGHT)
 
-    stitched = cv2.imread(frames[0])
+    # Teilstücke sammeln und erst am Ende einmal zusammensetzen, statt pro Schritt
+    # das komplette Bild neu zu kopieren
+    pieces = [load_frame(frames[0], crop_bottom)]
     for i, path in enumerate(frames[1:], 1):
-        next_img = cv2.imread(path)
-        stitched = _stitch_pair(stitched, next_img, template_height_px=TEMPLATE_HEIGHT, step_index=i, debug_path=debug_path)
+        # Zeitbudget erschöpft → restliche Frames weglassen statt die Deadline zu reißen
+        if expired():
+            record_degradation("stitch_truncated", stitched_frames=i, total_frames=len(frames))
+            break
+        next_img = load_frame(path, crop_bottom)
+        base_tail = _tail(pieces, next_img.shape[0])
+        remainder = _stitch_pair(
+            base_tail,
+            next_img,
+            template_height_px=TEMPLATE_HEIGHT,
+            step_index=i,
+            debug_path=debug_path,
+            debug=not low_memory_mode(),
+        )
+        pieces.append(remainder)
         log("info", "Stitching-Fortschritt", step=i, filename=os.path.basename(path))
-    cv2.imwrite(stitched_path, stitched)
-    
 
+    # Der obere Rand liegt vollständig im ersten Frame → dort abschneiden, bevor
+    # das lange Bild überhaupt entsteht
     log("info", "🔧 Nachbearbeitung: Entferne oberen Rand")
-    detect_and_remove_top_border(stitched_path)
+    with track_stage("top-border"):
+        cut_y = find_top_border(pieces[0])
+        if cut_y > 0:
+            pieces[0] = pieces[0][cut_y:]
+            log("info", "🗑️ Oberer Rand entfernt", removed_height=cut_y)
+        else:
+            log("warning", "⚠️ Keine klare horizontale Linie gefunden, Bild bleibt unverändert")
+
+    stitched = pieces[0] if len(pieces) == 1 else np.vstack(pieces)
+    cv2.imwrite(stitched_path, stitched)
     log("info", "✅ Stitching erfolgreich abgeschlossen")
-    
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Die Pipeline-Module liegen flach in src/python und importieren sich gegenseitig ohne Paket
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -0,0 +1,143 @@
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+import deadline
+from card_pipeline import ocr_cards
+from ocr_extract import ocr_extract
+from stitch_overlap import stitch_scroll_sequence
+
+
+FRAME_HEIGHT = 1200
+CROP_BOTTOM = 60  # dunkler Rand unter jedem Frame, wie die Statusleiste bei echten Aufnahmen
+IMAGE_HEIGHT = 4200
+
+
+def fake_image_to_string(region, config="", **kwargs):
+    """Deterministisches "OCR": gleiche Pixel → gleicher Text, Preise mit Whitelist fest."""
+    if "whitelist" in config:
+        return "12,34 €"
+    return f"T{int(region.astype(np.int64).sum()) % 100000}"
+
+
+def transaction_list():
+    """
+    Langes Bild wie stitched.png: Kopf, Karten, Datums-Überschriften, zwei gleiche Karten.
+    Gibt (Bild, obere Kanten der Karten direkt unter einer Datums-Überschrift) zurück.
+    """
+    image = np.full((IMAGE_HEIGHT, 1200, 3), 230, dtype=np.uint8)
+    cv2.rectangle(image, (0, 0), (1200, 40), (255, 255, 255), -1)
+    y, index = 120, 0
+    dated_tops = []
+    while y + 150 < IMAGE_HEIGHT - 50:
+        cv2.rectangle(image, (100, y), (900, y + 150), (255, 255, 255), -1)
+        label = "Netflix" if index in (5, 6) else f"Name {index}"
+        cv2.putText(image, label, (200, y + 45), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2)
+        cv2.putText(image, "Kategorie", (200, y + 85), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (90, 90, 90), 2)
+        color = (145, 24, 54) if index % 2 else (85, 198, 44)
+        cv2.putText(image, "-12,34", (726, y + 70), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+        if index % 3 == 2:
+            y += 230
+            cv2.putText(image, f"{index}.09. Di", (120, y - 12), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (60, 60, 60), 2)
+            dated_tops.append(y)
+        else:
+            y += 170
+        index += 1
+    return image, dated_tops
+
+
+def uniform_offsets(step):
+    offsets = list(range(0, IMAGE_HEIGHT - FRAME_HEIGHT + 1, step))
+    if offsets[-1] != IMAGE_HEIGHT - FRAME_HEIGHT:
+        offsets.append(IMAGE_HEIGHT - FRAME_HEIGHT)
+    return offsets
+
+
+def header_cut_offsets(dated_top):
+    """
+    Frames so legen, dass die Karte bei dated_top im vorherigen Frame unten
+    angeschnitten ist und im nächsten 25 px unter der Oberkante beginnt – ihre
+    Datums-Überschrift liegt dort oberhalb des Frames (Überlappung 175 px).
+    """
+    top_offset = dated_top - 25
+    previous = top_offset - FRAME_HEIGHT + 175
+    offsets = list(range(0, previous, 700)) + [previous, top_offset]
+    offsets += list(range(top_offset + 700, IMAGE_HEIGHT - FRAME_HEIGHT, 700)) + [IMAGE_HEIGHT - FRAME_HEIGHT]
+    return offsets
+
+
+def write_frames(image, shots_path, offsets):
+    shots_path.mkdir()
+    for i, offset in enumerate(offsets):
+        frame = np.full((FRAME_HEIGHT + CROP_BOTTOM, image.shape[1], 3), 10, dtype=np.uint8)
+        frame[:FRAME_HEIGHT] = image[offset:offset + FRAME_HEIGHT]
+        cv2.imwrite(str(shots_path / f"shot_{i:03d}.png"), frame)
+
+
+@pytest.fixture(autouse=True)
+def fake_tesseract(monkeypatch):
+    monkeypatch.setattr("pytesseract.image_to_string", fake_image_to_string)
+    # configure_tesseract setzt die Variable; nach dem Test wiederherstellen
+    monkeypatch.delenv("TESSDATA_PREFIX", raising=False)
+    deadline.set_deadline(None)
+
+
+@pytest.mark.parametrize("frames", ["step-300", "step-400", "step-700", "step-1000", "header-cut"])
+def test_card_mode_matches_stitch_mode(tmp_path, frames):
+    image, dated_tops = transaction_list()
+    offsets = header_cut_offsets(dated_tops[2]) if frames == "header-cut" else uniform_offsets(int(frames[5:]))
+    shots_path = tmp_path / "shots"
+    write_frames(image, shots_path, offsets)
+    stitched_path = str(tmp_path / "stitched.png")
+    layout_cache_path = str(tmp_path / "layout.json")
+
+    stitch_scroll_sequence(str(shots_path), stitched_path, str(tmp_path / "debug_stitch"), crop_bottom=CROP_BOTTOM)
+    stitched = ocr_extract(
+        stitched_path, str(tmp_path / "debug"), window_size=(600, 1000), layout_cache_path=layout_cache_path, debug=False
+    )
+    cards = ocr_cards(
+        str(shots_path), str(tmp_path / "debug"), window_size=(600, 1000), crop_bottom=CROP_BOTTOM,
+        layout_cache_path=layout_cache_path,
+    )
+
+    # color_lab hängt an den ROI-Pixeln (Rundung), alles andere muss identisch sein
+    strip = lambda items: [{key: value for key, value in item.items() if key != "color_lab"} for item in items]
+    assert len(cards) == 21
+    assert strip(cards) == strip(stitched)
+    assert len({item["date"] for item in cards}) > 3
+
+
+def test_card_mode_configures_tesseract_and_removes_stale_result_image(tmp_path, monkeypatch):
+    import pytesseract
+    from ocr_extract import TESSERACT_CMD
+
+    monkeypatch.setattr(pytesseract.pytesseract, "tesseract_cmd", "tesseract")
+    shots_path = tmp_path / "shots"
+    write_frames(transaction_list()[0], shots_path, uniform_offsets(700))
+    debug_path = tmp_path / "debug"
+    debug_path.mkdir()
+    (debug_path / "ocr_result.png").write_bytes(b"stale")
+
+    ocr_cards(str(shots_path), str(debug_path), crop_bottom=CROP_BOTTOM, layout_cache_path=str(tmp_path / "layout.json"))
+
+    assert not (debug_path / "ocr_result.png").exists()
+    assert pytesseract.pytesseract.tesseract_cmd == TESSERACT_CMD
+
+
+def test_item_events_carry_provisional_type(tmp_path, capsys):
+    shots_path = tmp_path / "shots"
+    write_frames(transaction_list()[0], shots_path, uniform_offsets(700))
+    stitched_path = str(tmp_path / "stitched.png")
+    layout_cache_path = str(tmp_path / "layout.json")
+    stitch_scroll_sequence(str(shots_path), stitched_path, str(tmp_path / "debug_stitch"), crop_bottom=CROP_BOTTOM)
+    ocr_extract(stitched_path, str(tmp_path / "debug"), layout_cache_path=layout_cache_path, debug=False)
+    ocr_cards(str(shots_path), str(tmp_path / "debug"), crop_bottom=CROP_BOTTOM, layout_cache_path=layout_cache_path)
+
+    events = [json.loads(line[len("LOG: "):]) for line in capsys.readouterr().out.splitlines() if line.startswith("LOG: ")]
+    item_events = [event["data"] for event in events if event["message"].startswith("📝 Item ")]
+    assert len(item_events) == 42
+    # Vorzeichen-Fallback statt fehlendem Typ; der endgültige Typ folgt gesammelt
+    assert all(event["type_provisional"] is True for event in item_events)
+    assert all(event["type"] == ("expense" if "-" in event["price"] else "income") for event in item_events)
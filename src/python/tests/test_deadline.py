@@ -0,0 +1,27 @@
+import json
+
+import deadline
+
+
+def test_budgets_are_opt_in():
+    # main.py übergibt ohne Flags genau diese Standardwerte
+    deadline.set_deadline(deadline.DEFAULT_DEADLINE_S, dict(deadline.DEFAULT_STAGE_BUDGETS))
+
+    # Ohne Flags kein Zeitlimit: keine Stage kürzt stillschweigend seine Arbeit
+    for stage in ("capture", "stitch", "ocr"):
+        with deadline.stage_budget(stage):
+            assert deadline.remaining() is None
+            assert not deadline.expired()
+
+
+def test_degradation_is_logged_under_its_stage(capsys):
+    deadline.set_deadline(None, {"ocr": 0.001})
+    with deadline.stage_budget("ocr"):
+        deadline.record_degradation("ocr_truncated", processed_items=3, total_items=10)
+
+    [line] = capsys.readouterr().out.splitlines()
+    event = json.loads(line[len("LOG: "):])
+    assert event["step"] == "ocr"
+    assert deadline.deadline_summary()["degradations"] == [
+        {"stage": "ocr", "kind": "ocr_truncated", "processed_items": 3, "total_items": 10}
+    ]
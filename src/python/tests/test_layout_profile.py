@@ -0,0 +1,78 @@
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from layout_profile import (
+    BASELINE_BOX_WIDTHS,
+    DEFAULT_ANCHORS,
+    DEFAULT_FIRST_DATE,
+    DEFAULT_METRICS,
+    get_layout_profile,
+    save_widened_profile,
+)
+from ocr_extract import prepare_planes, scan_field
+
+
+def card_image(width, names, card_height=110, gap=40):
+    """Graue Liste mit weißen Karten und schwarzem Namens-Balken der Länge names[i]."""
+    height = gap + len(names) * (card_height + gap)
+    image = np.full((height, width + 200, 3), 230, dtype=np.uint8)
+    boxes = []
+    for i, name_length in enumerate(names):
+        x, y = 100, gap + i * (card_height + gap)
+        cv2.rectangle(image, (x, y), (x + width - 1, y + card_height - 1), (255, 255, 255), -1)
+        image[y + 25:y + 45, x + 100:x + 100 + name_length] = 0
+        boxes.append({"x": x, "y": y, "w": width, "h": card_height})
+    return image, boxes
+
+
+@pytest.mark.parametrize("width", [*BASELINE_BOX_WIDTHS, 800])
+def test_default_size_card_keeps_baseline_anchors(tmp_path, width):
+    image, boxes = card_image(width, [40])
+    profile = get_layout_profile("default", boxes, prepare_planes(image), str(tmp_path / "layout.json"))
+
+    # Handabgestimmte Offsets und Schwellen bleiben exakt, solange die Karte in den Bereich passt
+    assert profile["scale"] == 1.0
+    assert profile["anchors"] == DEFAULT_ANCHORS
+    assert profile["first_date"] == DEFAULT_FIRST_DATE
+    assert profile["metrics"] == DEFAULT_METRICS
+
+
+def test_scale_is_relative_to_baseline_range(tmp_path):
+    cache_path = str(tmp_path / "layout.json")
+    low, high = BASELINE_BOX_WIDTHS
+    image, boxes = card_image(high * 2, [40])
+    wide = get_layout_profile("wide", boxes, prepare_planes(image), cache_path)
+    image, boxes = card_image(low // 2, [40])
+    narrow = get_layout_profile("narrow", boxes, prepare_planes(image), cache_path)
+    image, boxes = card_image(high, [40])
+    default = get_layout_profile("default", boxes, prepare_planes(image), cache_path)
+
+    # Unabhängig davon, welches Fenster zuerst kalibriert wurde
+    assert wide["scale"] == 2.0
+    assert narrow["scale"] == 0.5
+    assert default["scale"] == 1.0
+
+
+def test_long_field_widens_cached_extent(tmp_path):
+    cache_path = str(tmp_path / "layout.json")
+    image, boxes = card_image(BASELINE_BOX_WIDTHS[0], [40] * 8 + [500])
+    planes = prepare_planes(image)
+    profile = get_layout_profile("default", boxes, planes, cache_path)
+    calibrated = profile["extents"]["name"]
+    assert calibrated < 500
+
+    last = boxes[-1]
+    _, _, _, length = scan_field(planes, profile, "name", last["x"], last["y"])
+
+    # Kein Abschneiden an der kalibrierten Grenze; das Profil wächst und wird gespeichert
+    assert length > 500
+    assert profile["extents"]["name"] > calibrated
+    save_widened_profile(profile, cache_path)
+    with open(cache_path, encoding="utf-8") as handle:
+        cached = json.load(handle)["profiles"]["default"]
+    assert cached["extents"]["name"] == profile["extents"]["name"]
+    assert "widened" not in cached
+    assert [path.name for path in tmp_path.iterdir()] == ["layout.json"]
@@ -0,0 +1,41 @@
+import tracemalloc
+
+import numpy as np
+
+import memory_monitor
+from memory_monitor import memory_summary, set_memory_budget, track_stage
+
+
+def test_no_tracing_without_budget():
+    set_memory_budget(None)
+    with track_stage("ocr"):
+        assert not tracemalloc.is_tracing()
+    assert memory_summary()["stages"]["ocr"]["traced_peak_mb"] is None
+    assert memory_summary()["stages"]["ocr"]["peak_rss_mb"] > 0
+
+
+def test_outermost_stage_stops_tracing():
+    set_memory_budget(None, trace_allocations=True)
+    with track_stage("capture"):
+        with track_stage("crop"):
+            buffer = np.ones(4 * 1024 * 1024, dtype=np.uint8)
+            del buffer
+        assert tracemalloc.is_tracing()
+    assert not tracemalloc.is_tracing()
+
+    stages = memory_summary()["stages"]
+    # Der Peak der inneren Stage zählt auch für die äußere
+    assert stages["crop"]["traced_peak_mb"] >= 4
+    assert stages["capture"]["traced_peak_mb"] >= stages["crop"]["traced_peak_mb"]
+
+
+def test_budget_check_falls_back_to_max_rss(monkeypatch):
+    # macOS ohne psutil: kein /proc, nur ru_maxrss
+    monkeypatch.setattr(memory_monitor, "psutil", None)
+    monkeypatch.setattr(memory_monitor, "open", lambda *args, **kwargs: (_ for _ in ()).throw(OSError()), raising=False)
+    set_memory_budget(1)
+    with track_stage("stitch"):
+        pass
+    assert memory_monitor.low_memory_mode()
+    assert memory_summary()["stages"]["stitch"]["peak_rss_mb"] > 1
+    set_memory_budget(None)
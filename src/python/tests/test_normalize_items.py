@@ -0,0 +1,44 @@
+import json
+from datetime import datetime
+
+from normalize_items import normalize_items, summarize_import
+
+
+def test_normalize_items_types_prices_and_dates():
+    items = [
+        {"name": "Miete", "price": "-1.200,50 €", "date": "30.12. Di", "type": "expense"},
+        {"name": "Gehalt", "price": "2.000,00 €", "date": "Heute", "type": "income"},
+    ]
+    normalized = normalize_items(items, run_time=datetime(2026, 1, 2, 12, 0))
+
+    assert [entry["amount"] for entry in normalized] == [1200.5, 2000.0]
+    # Tag/Monat nach dem Run-Datum → Vorjahr
+    assert [entry["date_iso"] for entry in normalized] == ["2025-12-30", "2026-01-02"]
+    assert all(entry["fingerprint"] for entry in normalized)
+
+
+def test_unreadable_price_and_date_become_none():
+    items = [{"name": "Kaputt", "price": "€", "date": "31.02. Di", "type": "expense"}]
+    [entry] = normalize_items(items, run_time=datetime(2026, 3, 5))
+
+    assert entry["amount"] is None
+    assert entry["date_iso"] is None
+    assert entry["fingerprint"]
+
+
+def test_summarize_import_skips_zero_amount(tmp_path):
+    imported_path = tmp_path / "imported.jsonl"
+    items = normalize_items(
+        [
+            {"name": "Erstattung", "price": "0,00 €", "date": "01.01. Do", "type": "income"},
+            {"name": "Bar", "price": "-25,00 €", "date": "01.01. Do", "type": "expense"},
+            {"name": "", "price": "-5,00 €", "date": "01.01. Do", "type": "expense"},
+        ],
+        run_time=datetime(2026, 1, 2),
+    )
+    imported_path.write_text(json.dumps({"fingerprint": items[1]["fingerprint"]}) + "\n", encoding="utf-8")
+
+    summary = summarize_import(items, imported_path=str(imported_path))
+
+    # 0,00 € lehnt die Import-Route ab → ungültig statt neu
+    assert summary == {"new_rows": 0, "duplicates": 1, "invalid": 2}
@@ -0,0 +1,90 @@
+import cv2
+import numpy as np
+import pytest
+
+from ocr_extract import EXPENSE_LAB, INCOME_LAB, classify_amounts_from_color, classify_item_types
+
+
+def price_region(rgb, size=(24, 80)):
+    """Weiße Preis-ROI mit farbigem Text-Balken in der Mitte."""
+    region = np.full((*size, 3), 255, dtype=np.uint8)
+    region[8:16, 10:70] = rgb
+    return region
+
+
+def lab_of(rgb):
+    """RGB → Lab in echten Einheiten (L 0–100, a/b um 0)."""
+    lab = cv2.cvtColor(np.array([[rgb]], dtype=np.float32) / 255.0, cv2.COLOR_RGB2LAB)
+    return lab[0, 0]
+
+
+@pytest.mark.parametrize(
+    "rgb, expected",
+    [
+        ((54, 24, 145), "expense"),  # Lila wie Ausgaben
+        ((44, 198, 85), "income"),  # Grün wie Einnahmen
+    ],
+)
+def test_reference_colors_classify(rgb, expected):
+    [(detected, lab)] = classify_amounts_from_color([price_region(rgb)])
+    assert detected == expected
+    assert lab == pytest.approx(list(lab_of(rgb)), abs=1.5)
+
+
+def test_lightness_is_not_overweighted():
+    # Dunkles, gedecktes Grün: mit L × 2,55 (uint8-Lab) läge es näher an der dunklen
+    # Ausgaben-Referenz, in echten Lab-Einheiten entscheidet der Farbton
+    rgb = (30, 60, 40)
+    lab = lab_of(rgb)
+    assert np.linalg.norm(lab - INCOME_LAB) < np.linalg.norm(lab - EXPENSE_LAB)
+    [(detected, _)] = classify_amounts_from_color([price_region(rgb)])
+    assert detected == "income"
+
+
+def test_classify_item_types_sets_sign(capsys):
+    items = [
+        {"price": "12,34 €", "name": "Miete"},
+        {"price": "-5,00 €", "name": "Gehalt"},
+    ]
+    regions = [price_region((145, 24, 54)), price_region((85, 198, 44))]  # BGR
+    classify_item_types(items, regions)
+
+    assert [item["type"] for item in items] == ["expense", "income"]
+    assert [item["price"] for item in items] == ["-12,34 €", "5,00 €"]
+    # Ein gesammeltes Event statt eines Log-Schwalls pro Item
+    output = capsys.readouterr().out
+    assert output.count("📝 Item") == 0
+    assert output.count("🎨 Preisfarben klassifiziert") == 1
+
+
+@pytest.mark.parametrize("y_offset", [0, 150])
+def test_first_date_extent_follows_offset(monkeypatch, y_offset):
+    from layout_profile import calibrate_layout_profile
+    from ocr_extract import prepare_planes, read_first_date
+
+    # Dunkle Kopfzeile mit hellem Datum (Maske: heller als 190 = Schrift)
+    image = np.full((600, 1400, 3), 30, dtype=np.uint8)
+    fx, fy, fh, _ = (1110, 9, 26, 12)
+    image[fy + y_offset + 4:fy + y_offset + 22, fx:fx + 90] = 230
+    planes = prepare_planes(image)
+    profile = calibrate_layout_profile([], planes, 0, 1.0)
+    widths = []
+    monkeypatch.setattr(
+        "pytesseract.image_to_string",
+        lambda region, **kwargs: widths.append(region.shape[1]) or "30.09. Di",
+    )
+
+    assert read_first_date(planes, profile, None, y_offset=y_offset) == "30.09. Di"
+    # Text (90 px) plus Puffer – nicht nur der Puffer außerhalb eines festen Bandes
+    assert widths == [90 + 12]
+
+
+def test_dark_integral_counts_thresh_zero_pixels():
+    from ocr_extract import dark_pixels, prepare_planes
+
+    rng = np.random.default_rng(0)
+    image = rng.choice(np.array([0, 200, 253, 254, 255], dtype=np.uint8), size=(40, 60, 3))
+    planes = prepare_planes(image)
+
+    expected = int(np.count_nonzero(planes["thresh"][5:30, 10:50] == 0))
+    assert dark_pixels(planes["dark_integral"], 10, 5, 50, 30) == expected
@@ -0,0 +1,41 @@
+import json
+
+from results_store import append_run, fingerprint_items, imported_fingerprints, load_index, load_run
+
+
+def test_append_and_load_run_by_byte_range(tmp_path):
+    results_path, index_path = str(tmp_path / "results.jsonl"), str(tmp_path / "index.json")
+    first = [{"name": "Miete", "price": "-800,00 €", "date": "01.10. Mi", "type": "expense"}]
+    second = [{"name": "Bar", "price": "-25,00 €", "date": "02.10. Do", "type": "expense"}] * 2
+
+    first_id = append_run(first, run_id="a", results_path=results_path, index_path=index_path)
+    second_id = append_run(second, run_id="b", results_path=results_path, index_path=index_path)
+
+    runs = load_index(index_path)["runs"]
+    assert [run["count"] for run in runs] == [1, 2]
+    assert [record["name"] for record in load_run(second_id, results_path, index_path)] == ["Bar", "Bar"]
+    assert load_run(first_id, results_path, index_path)[0]["position"] == 0
+    assert load_run("missing", results_path, index_path) is None
+    with open(results_path, encoding="utf-8") as handle:
+        assert len([json.loads(line) for line in handle]) == 3
+
+
+def test_identical_items_get_distinct_fingerprints():
+    item = {"name": "Bar", "price": "-25,00 €", "date": "02.10. Do", "type": "expense"}
+    spaced = {**item, "name": "  bar "}
+    fingerprints = fingerprint_items([item, spaced])
+    assert len(set(fingerprints)) == 2
+    assert fingerprint_items([spaced]) == fingerprints[:1]
+
+
+def test_imported_fingerprints_skip_broken_lines(tmp_path):
+    imported_path = tmp_path / "imported.jsonl"
+    imported_path.write_text(
+        '{"fingerprint": "a", "imported_at": "2026-01-01T00:00:00Z"}\n'
+        '{"imported_at": "2026-01-01T00:00:00Z"}\n'
+        "[1, 2]\n"
+        '{"fingerprint": "b", "impor',
+        encoding="utf-8",
+    )
+    # Abgeschnittene oder fremde Zeilen dürfen die OCR-Phase nicht scheitern lassen
+    assert imported_fingerprints(str(imported_path)) == {"a"}
@@ -0,0 +1,66 @@
+import cv2
+import numpy as np
+import pytest
+
+from scroll_overlap import (
+    MAX_SCROLL_AMOUNT,
+    MIN_SCROLL_AMOUNT,
+    OVERLAP_MARGIN,
+    measure_scroll_overlap,
+    next_scroll_amount,
+    replay_frame_source,
+)
+from stitch_overlap import TEMPLATE_HEIGHT, match_template_y
+
+
+@pytest.fixture
+def long_image(tmp_path):
+    """Langes Bild mit eindeutigen Streifen, damit jede Zeile wiedererkennbar ist."""
+    rng = np.random.default_rng(7)
+    image = np.full((3000, 400, 3), 240, dtype=np.uint8)
+    for y in range(0, 3000, 45):
+        image[y:y + 20, 20:380] = rng.integers(0, 200, size=(20, 360, 3), dtype=np.uint8)
+    path = tmp_path / "long.png"
+    cv2.imwrite(str(path), image)
+    return str(path)
+
+
+def capture_pair(source, tmp_path, amount):
+    first, second = str(tmp_path / "a.png"), str(tmp_path / "b.png")
+    source["capture"](first)
+    source["scroll"](amount)
+    source["capture"](second)
+    return cv2.imread(first), cv2.imread(second)
+
+
+def test_replay_overlap_matches_scroll_distance(long_image, tmp_path):
+    source = replay_frame_source(long_image, frame_height=900, px_per_unit=2.0)
+    prev_img, next_img = capture_pair(source, tmp_path, 250)
+
+    template_start_y, match_y, score = match_template_y(prev_img, next_img, TEMPLATE_HEIGHT)
+    shift_px, overlap_px, measured_score = measure_scroll_overlap(prev_img, next_img)
+
+    assert score > 0.99 and measured_score == score
+    assert template_start_y - match_y == shift_px == 500
+    assert overlap_px == 400
+    assert source["window"] == (0, 0, 200, 450)
+
+
+def test_next_scroll_amount_targets_minimal_overlap(long_image, tmp_path):
+    source = replay_frame_source(long_image, frame_height=900, px_per_unit=2.0)
+    prev_img, next_img = capture_pair(source, tmp_path, 250)
+    shift_px, _, score = measure_scroll_overlap(prev_img, next_img)
+
+    amount = next_scroll_amount(250, shift_px, prev_img.shape[0], score)
+    prev_img, next_img = capture_pair(source, tmp_path, amount)
+    _, overlap_px, _ = measure_scroll_overlap(prev_img, next_img)
+
+    # Überlappung landet knapp über Template + Reserve (Rundung auf ganze Scroll-Einheiten)
+    assert TEMPLATE_HEIGHT + OVERLAP_MARGIN <= overlap_px <= TEMPLATE_HEIGHT + OVERLAP_MARGIN + 2
+
+
+def test_next_scroll_amount_backs_off_on_bad_match():
+    assert next_scroll_amount(700, 0, 900, 0.99) == int(700 * 0.75)
+    assert next_scroll_amount(700, 500, 900, 0.2) == int(700 * 0.75)
+    assert next_scroll_amount(100, 500, 900, 0.1) == MIN_SCROLL_AMOUNT
+    assert next_scroll_amount(10, 1, 100000, 0.99) == MAX_SCROLL_AMOUNT
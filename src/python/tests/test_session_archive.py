@@ -0,0 +1,35 @@
+import cv2
+import numpy as np
+
+from session_archive import archive_session, list_sessions, load_session, restore_frames
+
+
+def write_frames(path, count):
+    path.mkdir()
+    for i in range(count):
+        frame = np.full((40, 60, 3), i * 40, dtype=np.uint8)
+        cv2.imwrite(str(path / f"shot_{i:03d}.png"), frame)
+
+
+def test_sessions_in_same_second_get_distinct_ids(tmp_path):
+    shots = tmp_path / "shots"
+    write_frames(shots, 3)
+    sessions_dir = str(tmp_path / "sessions")
+
+    first = archive_session(str(shots), window=(600, 1000), sessions_dir=sessions_dir)
+    second = archive_session(str(shots), window=(600, 1000), sessions_dir=sessions_dir)
+
+    assert first != second
+    assert list_sessions(sessions_dir) == sorted([first, second])
+    assert list_sessions(sessions_dir, since=first[:8]) == sorted([first, second])
+
+
+def test_restore_frames_in_order(tmp_path):
+    shots = tmp_path / "shots"
+    write_frames(shots, 2)
+    sessions_dir = str(tmp_path / "sessions")
+    session_id = archive_session(str(shots), sessions_dir=sessions_dir)
+
+    restored = restore_frames(session_id, str(tmp_path / "restored"), sessions_dir)
+    assert [cv2.imread(path)[0, 0, 0] for path in restored] == [0, 40]
+    assert load_session(session_id, sessions_dir)["window"] is None